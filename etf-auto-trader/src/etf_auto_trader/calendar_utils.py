@@ -2,10 +2,31 @@ from __future__ import annotations
 
 import datetime as dt
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
 import exchange_calendars as xcals
-import pandas as pd
+import numpy as np
+
+
+@lru_cache(maxsize=4)
+def _get_cal(name: str):
+    # 构造日历要生成整段 sessions，很慢；同名日历在进程内只建一次
+    return xcals.get_calendar(name)
+
+
+@lru_cache(maxsize=4)
+def _get_sessions(name: str) -> np.ndarray:
+    # 升序的交易日 datetime64[D] 数组，供 searchsorted 做 O(log n) 查找
+    return _get_cal(name).sessions.values.astype("datetime64[D]")
+
+
+def third_fridays(years: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """批量返回各 (year, month) 的第三个周五（datetime64[D]），不逐个构造 date 对象。"""
+    ym = (np.asarray(years, dtype=np.int64) - 1970) * 12 + (np.asarray(months, dtype=np.int64) - 1)
+    first = ym.astype("datetime64[M]").astype("datetime64[D]")
+    # 先滚到当月第一个周五（1 号是周五则不动），再往后数 2 个周五
+    return np.busday_offset(first, 2, roll="forward", weekmask="Fri")
 
 
 @dataclass(frozen=True)
@@ -13,40 +34,37 @@ class TradingCalendar:
     name: str = "XNYS"  # NYSE
 
     def __post_init__(self):
-        # nothing
-        pass
-
-    @property
-    def cal(self):
-        return xcals.get_calendar(self.name)
+        # frozen dataclass：用 object.__setattr__ 挂上缓存好的日历，之后每次访问不再重建
+        object.__setattr__(self, "cal", _get_cal(self.name))
+        object.__setattr__(self, "_sessions", _get_sessions(self.name))
 
     def is_trading_day(self, d: dt.date) -> bool:
-        # exchange_calendars 提供 is_session，可以直接判断某天是否为交易日
-        return bool(self.cal.is_session(pd.Timestamp(d)))
+        # 直接在缓存的 sessions 数组上二分查找，不构造 Timestamp
+        x = np.datetime64(d, "D")
+        i = int(np.searchsorted(self._sessions, x))
+        return bool(i < self._sessions.size and self._sessions[i] == x)
+
     def trading_day_index(self, d: dt.date) -> Optional[int]:
-        # Index trading days by their position since 1970-01-01 (stable)
+        # Index trading days by their 1-based position in the calendar's sessions (stable)
         # Non-trading day returns None
-        if not self.is_trading_day(d):
-            return None
-        # Use trading sessions list
-        sessions = self.cal.sessions_in_range("1970-01-01", d.strftime("%Y-%m-%d"))
-        # sessions includes d
-        return int(len(sessions))
+        x = np.datetime64(d, "D")
+        i = int(np.searchsorted(self._sessions, x))
+        if i < self._sessions.size and self._sessions[i] == x:
+            return i + 1
+        return None
 
     def trading_days_between(self, d1: dt.date, d2: dt.date) -> int:
         """Return index(d2)-index(d1). d1 and d2 should be trading days."""
-        i1 = self.trading_day_index(d1)
-        i2 = self.trading_day_index(d2)
-        if i1 is None or i2 is None:
+        xs = np.array([np.datetime64(d1, "D"), np.datetime64(d2, "D")])
+        idx = np.searchsorted(self._sessions, xs)
+        n = self._sessions.size
+        if not all(i < n and self._sessions[i] == x for i, x in zip(idx, xs)):
             raise ValueError("d1 and d2 must be trading days")
-        return i2 - i1
+        return int(idx[1] - idx[0])
 
     def third_friday(self, d: dt.date) -> bool:
         # Third Friday of the month (calendar), and it must be a trading day
-        year, month = d.year, d.month
-        first = dt.date(year, month, 1)
-        # weekday: Monday=0..Sunday=6, we want Friday=4
-        offset = (4 - first.weekday()) % 7
-        first_friday = first + dt.timedelta(days=offset)
-        third_friday = first_friday + dt.timedelta(days=14)
-        return d == third_friday and self.is_trading_day(d)
+        x = np.datetime64(d, "D")
+        tf = third_fridays(np.array([d.year]), np.array([d.month]))[0]
+        # 先比日期，命中才在 sessions 上二分查找是否交易日
+        return bool(x == tf) and self.is_trading_day(d)
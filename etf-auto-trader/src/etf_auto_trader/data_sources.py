@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 import datetime as dt
+import os
+import time
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 
 
@@ -16,7 +20,61 @@ class MarketData:
     month_high_close: float
 
 
+_SESSION = None
+
+
+def _http_session():
+    """备用汇率接口用的共享 Session（连接池复用 TCP/TLS）；requests 仍然按需导入。"""
+    global _SESSION
+    if _SESSION is None:
+        import requests  # type: ignore
+        from requests.adapters import HTTPAdapter  # type: ignore
+
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        _SESSION = session
+    return _SESSION
+
+
+CACHE_DIR = Path("data/cache")
+CACHE_TTL_SECONDS = 12 * 3600
+
+
+def _cache_file(symbol: str, start: dt.date, end: dt.date) -> Path:
+    safe = str(symbol).strip().replace("/", "_")
+    return CACHE_DIR / f"{safe}_{start.isoformat()}_{end.isoformat()}.pkl"
+
+
 def _download_yf(symbol: str, start: dt.date, end: dt.date) -> pd.DataFrame:
+    """带本地缓存的日线下载：同一 (symbol, start, end) 12 小时内直接读 data/cache/。
+
+    设置环境变量 ETF_NO_CACHE=1 可跳过缓存。
+    """
+    use_cache = str(os.environ.get("ETF_NO_CACHE", "")).strip() != "1"
+    path = _cache_file(symbol, start, end)
+    if use_cache:
+        try:
+            if time.time() - path.stat().st_mtime <= CACHE_TTL_SECONDS:
+                cached = pd.read_pickle(path)
+                if isinstance(cached, pd.DataFrame) and not cached.empty:
+                    return cached
+        except Exception:
+            pass
+
+    df = _fetch_yf(symbol, start, end)
+
+    if use_cache:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            df.to_pickle(tmp)
+            os.replace(tmp, path)
+        except Exception:
+            pass
+    return df
+
+
+def _fetch_yf(symbol: str, start: dt.date, end: dt.date) -> pd.DataFrame:
     # yfinance is imported lazily to keep module import light
     import yfinance as yf  # type: ignore
     df = yf.download(
@@ -35,7 +93,11 @@ def _download_yf(symbol: str, start: dt.date, end: dt.date) -> pd.DataFrame:
     df.columns = [str(c).strip() for c in df.columns]
     if "Date" not in df.columns or "Close" not in df.columns:
         raise RuntimeError(f"yfinance 返回列异常: {df.columns}")
-    df["Date"] = pd.to_datetime(df["Date"]).dt.date
+    # 保持 datetime64 列：后续按日期过滤走向量化比较，不逐行生成 dt.date 对象
+    dates = pd.to_datetime(df["Date"])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    df["Date"] = dates.dt.normalize()
     return df[["Date", "Close"]].sort_values("Date").reset_index(drop=True)
 
 
@@ -50,10 +112,10 @@ def fetch_fx_usdcny(asof_date: dt.date, symbol: str = "USDCNY=X", fallback: floa
     def _try(sym: str) -> float | None:
         try:
             df = _download_yf(sym, start, asof_date)
-            df = df[df["Date"] <= asof_date]
+            df = df[df["Date"] <= pd.Timestamp(asof_date)]
             if df.empty:
                 return None
-            return float(df.iloc[-1]["Close"])
+            return float(df["Close"].to_numpy()[-1])
         except Exception:
             return None
 
@@ -72,8 +134,7 @@ def fetch_fx_usdcny(asof_date: dt.date, symbol: str = "USDCNY=X", fallback: floa
 
     # 3) fallback provider
     try:
-        import requests  # type: ignore
-        resp = requests.get(
+        resp = _http_session().get(
             f"https://api.exchangerate.host/{asof_date.isoformat()}",
             params={"base": "USD", "symbols": "CNY"},
             timeout=10,
@@ -106,27 +167,27 @@ def fetch_signal_inputs(signal_symbol: str, asof_date: dt.date) -> MarketData:
         raise RuntimeError("价格数据为空")
 
     # 找到 asof_date 这行（若 asof_date 非交易日，外部应先避免）
-    df_today = df[df["Date"] <= asof_date].copy()
+    df_today = df[df["Date"] <= pd.Timestamp(asof_date)]
     if df_today.empty:
         raise RuntimeError("找不到 asof_date 之前的数据")
+    closes = df_today["Close"].to_numpy(dtype=np.float64)
     # 取最后一行做 close
-    close = float(df_today.iloc[-1]["Close"])
+    close = float(closes[-1])
 
-    if len(df_today) < 2:
+    if len(closes) < 2:
         raise RuntimeError("历史数据不足以获取 prev_close")
-    prev_close = float(df_today.iloc[-2]["Close"])
+    prev_close = float(closes[-2])
 
-    # MA200：滚动 200（按交易日序列）
-    df_today["ma200"] = df_today["Close"].rolling(200).mean()
-    ma200 = float(df_today.iloc[-1]["ma200"])
-    if pd.isna(ma200):
+    # MA200：只需要最后一个 200 交易日窗口，直接对尾部求均值（不做整列 rolling）
+    ma200 = float(closes[-200:].mean()) if len(closes) >= 200 else float("nan")
+    if np.isnan(ma200):
         # 保险起见：不足 200 时给出 NaN 并报错
         raise RuntimeError("历史数据不足以计算 MA200（需要至少 200 个交易日收盘）")
 
     # 本月最高收盘
     month_start = asof_date.replace(day=1)
-    month_df = df_today[df_today["Date"] >= month_start]
-    month_high = float(month_df["Close"].max())
+    in_month = (df_today["Date"] >= pd.Timestamp(month_start)).to_numpy()
+    month_high = float(np.nanmax(closes[in_month])) if in_month.any() else float("nan")
 
     return MarketData(
         date=asof_date,
@@ -146,8 +207,8 @@ def fetch_prices(symbols: List[str], asof_date: dt.date) -> Dict[str, float]:
     prices: Dict[str, float] = {}
     for s in symbols:
         df = _download_yf(s, start, asof_date)
-        df = df[df["Date"] <= asof_date]
+        df = df[df["Date"] <= pd.Timestamp(asof_date)]
         if df.empty:
             raise RuntimeError(f"拉不到价格: {s}")
-        prices[s] = float(df.iloc[-1]["Close"])
+        prices[s] = float(df["Close"].to_numpy()[-1])
     return prices
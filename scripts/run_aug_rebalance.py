@@ -3,6 +3,7 @@ import json
 import sys
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -11,7 +12,7 @@ sys.path.insert(0, str(ROOT / "src"))
 from etf_auto_trader.calendar_utils import TradingCalendar
 from etf_auto_trader.config import load_config
 from etf_auto_trader.data_sources import fetch_prices
-from etf_auto_trader.fees import BuyFees, SellExtraFees
+from etf_auto_trader.fees import SellExtraFees, buy_fees_for
 from etf_auto_trader.state import load_holdings
 
 
@@ -21,41 +22,19 @@ def _round_down(x: float, step: float) -> float:
     return (x // step) * step
 
 
-def buy_fee(cfg, shares: float) -> float:
-    bf = BuyFees(
-        commission_per_share=cfg.fees_buy.commission_per_share,
-        commission_min_usd=cfg.fees_buy.commission_min_usd,
-        platform_per_share=cfg.fees_buy.platform_per_share,
-        platform_min_usd=cfg.fees_buy.platform_min_usd,
-        clearing_per_share=cfg.fees_buy.clearing_per_share,
-        other_fixed_fee_usd=cfg.execution.other_fixed_fee_usd,
-    )
-    return bf.fee(abs(shares))
-
-
-def sell_extra_fee(cfg, shares: float) -> float:
-    sf = SellExtraFees(
-        activity_per_share=cfg.fees_sell_extra.activity_per_share,
-        activity_min_usd=cfg.fees_sell_extra.activity_min_usd,
-        activity_max_usd=cfg.fees_sell_extra.activity_max_usd,
-        cat_per_share=cfg.fees_sell_extra.cat_per_share,
-        sec_fee_usd=cfg.fees_sell_extra.sec_fee_usd,
-    )
-    return sf.fee(abs(shares))
-
-
-def affordable_shares_from_usd(cfg, usd_amount: float, price: float, side: str) -> float:
+def affordable_shares_from_usd(cfg, usd_amount: np.ndarray, price: np.ndarray, side: np.ndarray) -> np.ndarray:
+    """按 USD 金额换算股数（向量化）；BUY 为正、SELL 为负，金额或价格无效时为 0。"""
     allow_frac = cfg.execution.allow_fractional_shares
     step = cfg.execution.fractional_step
-    if usd_amount <= 0 or price <= 0:
-        return 0.0
-    raw = usd_amount / price
+    valid = (usd_amount > 0) & (price > 0)
+    raw = np.divide(usd_amount, price, out=np.zeros_like(usd_amount), where=valid)
     if allow_frac:
         sh = _round_down(raw, step)
-        sh = float(max(0.0, round(sh, 10)))
-        return sh if side == "BUY" else -sh
-    sh = int(raw)
-    return float(sh) if side == "BUY" else -float(sh)
+        sh = np.maximum(0.0, np.round(sh, 10))
+    else:
+        sh = np.trunc(raw)
+    sign = np.where(side == "BUY", 1.0, -1.0)
+    return np.where(valid, sh * sign, 0.0)
 
 
 def main():
@@ -71,7 +50,7 @@ def main():
     prices = fetch_prices(cfg.symbols.portfolio, asof)
     holdings = load_holdings()
 
-    df = holdings.copy()
+    df = pd.DataFrame({"ticker": list(holdings), "shares": list(holdings.values())})
     df["price"] = df["ticker"].map(prices).astype(float)
     df["value_cny"] = df["shares"].astype(float) * df["price"] * fx
     total_value_cny = float(df["value_cny"].sum())
@@ -82,33 +61,34 @@ def main():
 
     hold_th = target_each * 0.005
 
-    def action(x: float) -> str:
-        if abs(x) < hold_th:
-            return "HOLD"
-        return "BUY" if x > 0 else "SELL"
-
-    df["action"] = df["diff_cny"].apply(lambda x: action(float(x)))
+    # |diff| < 阈值为 HOLD，否则正买负卖（NaN 与原逻辑一样落到 SELL）
+    diff_cny = df["diff_cny"].to_numpy(dtype=float)
+    actions = np.select([np.abs(diff_cny) < hold_th, diff_cny > 0], ["HOLD", "BUY"], default="SELL").astype(object)
+    df["action"] = actions
 
     spread = cfg.execution.spread_cost_pct
     df["usd_amt"] = (df["diff_cny"].abs() / fx) * (1 - spread)
-    df.loc[df["action"] == "HOLD", "usd_amt"] = 0.0
+    df.loc[actions == "HOLD", "usd_amt"] = 0.0
 
-    df["shares_suggest"] = df.apply(
-        lambda r: affordable_shares_from_usd(cfg, float(r["usd_amt"]), float(r["price"]), str(r["action"])),
-        axis=1,
+    shares = affordable_shares_from_usd(
+        cfg,
+        df["usd_amt"].to_numpy(dtype=float),
+        df["price"].to_numpy(dtype=float),
+        actions,
     )
+    df["shares_suggest"] = shares
 
-    def fee_row(r) -> float:
-        act = str(r["action"])
-        sh = float(r["shares_suggest"])
-        if act == "HOLD" or sh == 0:
-            return 0.0
-        base = buy_fee(cfg, sh)
-        if act == "SELL":
-            base += sell_extra_fee(cfg, sh)
-        return base
-
-    df["fee_usd"] = df.apply(fee_row, axis=1)
+    bf = buy_fees_for(cfg)
+    sf = SellExtraFees(
+        activity_per_share=cfg.fees_sell_extra.activity_per_share,
+        activity_min_usd=cfg.fees_sell_extra.activity_min_usd,
+        activity_max_usd=cfg.fees_sell_extra.activity_max_usd,
+        cat_per_share=cfg.fees_sell_extra.cat_per_share,
+        sec_fee_usd=cfg.fees_sell_extra.sec_fee_usd,
+    )
+    abs_shares = np.abs(shares)
+    fee = bf.fee_array(abs_shares) + np.where(actions == "SELL", sf.fee_array(abs_shares), 0.0)
+    df["fee_usd"] = np.where((actions == "HOLD") | (shares == 0), 0.0, fee)
 
     out = {
         "date": asof.isoformat(),
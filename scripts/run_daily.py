@@ -7,9 +7,11 @@ ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT / "src"))
 
 from etf_auto_trader.config import load_config
-from etf_auto_trader.runner import run_daily
+from etf_auto_trader.runner import run_daily, wait_for_emails
 
 if __name__ == "__main__":
     cfg = load_config("config.yaml")
-    summary = run_daily(cfg)
+    # 邮件在后台发送，先打印摘要；最后等它发完，发送失败时让脚本以非 0 退出
+    summary = run_daily(cfg, wait_email=False)
     print(json.dumps(summary, ensure_ascii=False, indent=2))
+    wait_for_emails()
@@ -1,44 +1,71 @@
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 from datetime import date, datetime
-from typing import Any
+from functools import lru_cache
+from typing import Any, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import exchange_calendars as ecals
-from exchange_calendars.errors import DateOutOfBounds
 
 
-def _as_naive_day(x: Any) -> pd.Timestamp:
-    """
-    把输入转成“无时区”的日期（00:00:00）。
-    兼容：None/空字符串/auto/today/暂定/date/datetime/Timestamp/日期字符串
-    """
-    def _today() -> pd.Timestamp:
-        return pd.Timestamp.today().normalize()
-
-    if x is None:
-        return _today()
-
-    if isinstance(x, pd.Timestamp):
-        ts = x
-    elif isinstance(x, datetime):
-        ts = pd.Timestamp(x)
-    elif isinstance(x, date):
-        ts = pd.Timestamp(x)
-    elif isinstance(x, str):
-        s = x.strip()
-        if s in ("", "auto", "AUTO", "today", "TODAY", "暂定", "TBD", "tbd"):
-            return _today()
-        try:
-            ts = pd.Timestamp(s)
-        except Exception:
-            return _today()
-    else:
+# 同一次运行内反复取“今天”时复用同一个 Timestamp（60 秒后重新取）
+_TODAY_TTL_SECONDS = 60.0
+_today_cache: Optional[Tuple[pd.Timestamp, float]] = None
+
+
+def _today() -> pd.Timestamp:
+    global _today_cache
+    now = time.monotonic()
+    if _today_cache is None or now - _today_cache[1] > _TODAY_TTL_SECONDS:
+        _today_cache = (pd.Timestamp(date.today()), now)
+    return _today_cache[0]
+
+
+# 这些字符串一律视为“今天”
+_TODAY_SENTINELS = frozenset({"", "auto", "AUTO", "today", "TODAY", "暂定", "TBD", "tbd"})
+
+
+def _from_str(x: str) -> Optional[pd.Timestamp]:
+    s = x.strip()
+    if s in _TODAY_SENTINELS:
+        return None
+    # 最常见的 YYYY-MM-DD：直接走 fromisoformat，跳过 pandas 的通用解析
+    if len(s) == 10 and s[4] == "-" and s[7] == "-":
         try:
-            ts = pd.Timestamp(x)
-        except Exception:
-            return _today()
+            return pd.Timestamp(date.fromisoformat(s))
+        except ValueError:
+            pass
+    # 无法解析的字符串直接得到 NaT，不走异常
+    ts = pd.to_datetime(s, errors="coerce")
+    return None if ts is pd.NaT else ts
+
+
+def _from_any(x: Any) -> Optional[pd.Timestamp]:
+    try:
+        return pd.Timestamp(x)
+    except Exception:
+        return None
+
+
+# 按精确类型分派（一次 dict 查找代替 isinstance 链）；返回 None 表示回退到今天
+_TO_TIMESTAMP = {
+    type(None): lambda x: None,
+    pd.Timestamp: lambda x: x,
+    datetime: pd.Timestamp,
+    date: pd.Timestamp,
+    str: _from_str,
+}
+
+
+@lru_cache(maxsize=1024, typed=True)
+def _naive_day_cached(x: Any) -> Optional[pd.Timestamp]:
+    """显式日期的解析结果按输入值缓存；返回 None 表示应回退到今天（“今天”本身不进缓存）。"""
+    ts = _TO_TIMESTAMP.get(type(x), _from_any)(x)
+    if ts is None:
+        return None
 
     # 去时区，归一化到日期
     if getattr(ts, "tzinfo", None) is not None:
@@ -46,16 +73,39 @@ def _as_naive_day(x: Any) -> pd.Timestamp:
     return ts.normalize()
 
 
-def _third_friday_of_month(d: pd.Timestamp) -> pd.Timestamp:
+def _as_naive_day(x: Any) -> pd.Timestamp:
     """
-    返回 d 所在月份的第三个周五（无时区日期）。
+    把输入转成“无时区”的日期（00:00:00）。
+    兼容：None/空字符串/auto/today/暂定/date/datetime/Timestamp/日期字符串
+    """
+    try:
+        ts = _naive_day_cached(x)
+    except TypeError:
+        # 不可哈希的输入（极少见）不走缓存
+        ts = _naive_day_cached.__wrapped__(x)
+    return _today() if ts is None else ts
+
+
+def third_fridays(years: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """
+    批量返回各 (year, month) 的第三个周五（datetime64[D]），不逐个构造 Timestamp。
     """
-    first = d.replace(day=1).normalize()
-    # weekday: Mon=0 ... Sun=6；Friday=4
-    offset = (4 - first.weekday()) % 7
-    first_friday = first + pd.Timedelta(days=offset)
-    third_friday = first_friday + pd.Timedelta(days=14)
-    return third_friday.normalize()
+    ym = (np.asarray(years, dtype=np.int64) - 1970) * 12 + (np.asarray(months, dtype=np.int64) - 1)
+    first = ym.astype("datetime64[M]").astype("datetime64[D]")
+    # 先滚到当月第一个周五（1 号是周五则不动），再往后数 2 个周五
+    return np.busday_offset(first, 2, roll="forward", weekmask="Fri")
+
+
+@lru_cache(maxsize=4)
+def _get_cal(name: str) -> ecals.ExchangeCalendar:
+    """构造交易日历要生成整段 sessions 索引，比较慢；同名日历在进程内只建一次。"""
+    return ecals.get_calendar(name)
+
+
+@lru_cache(maxsize=4)
+def _get_sessions(name: str) -> np.ndarray:
+    """升序的交易日 datetime64[D] 数组，供 searchsorted 做 O(log n) 查找。"""
+    return _get_cal(name).sessions.values.astype("datetime64[D]")
 
 
 @dataclass
@@ -63,44 +113,68 @@ class CalendarUtil:
     cal_name: str = "XNYS"
 
     def __post_init__(self) -> None:
-        self.cal = ecals.get_calendar(self.cal_name)
+        self.cal = _get_cal(self.cal_name)
+        self._sessions = _get_sessions(self.cal_name)
 
     def is_trading_day(self, when: Any = None) -> bool:
         """
-        exchange_calendars 的 is_session 需要“无时区”的 Timestamp。
+        在缓存的 sessions 数组上二分查找；超出日历范围视为非交易日。
         """
+        d = _as_naive_day(when).to_datetime64().astype("datetime64[D]")
+        i = int(np.searchsorted(self._sessions, d))
+        return bool(i < self._sessions.size and self._sessions[i] == d)
+
+    def trading_day_mask(self, days: np.ndarray) -> np.ndarray:
+        """is_trading_day 的向量化版本：days 为 datetime64[D] 数组。"""
+        days = np.asarray(days, dtype="datetime64[D]")
+        if self._sessions.size == 0:
+            return np.zeros(days.shape, dtype=bool)
+        i = np.searchsorted(self._sessions, days)
+        return (i < self._sessions.size) & (self._sessions[np.minimum(i, self._sessions.size - 1)] == days)
+
+    def third_friday_mask(self, days: np.ndarray) -> np.ndarray:
+        """third_friday 的向量化版本：days 为 datetime64[D] 数组。"""
+        days = np.asarray(days, dtype="datetime64[D]")
+        months = days.astype("datetime64[M]").astype(np.int64)
+        return third_fridays(months // 12 + 1970, months % 12 + 1) == days
+
+    def last_trading_day(self, when: Any = None) -> date:
+        """返回 <= when 的最近一个交易日（when 本身是交易日则返回它）。"""
         ts = _as_naive_day(when)
-        try:
-            return bool(self.cal.is_session(ts))
-        except DateOutOfBounds:
-            return False
+        # 与 is_trading_day 共用 sessions 数组：一次二分查找，不逐日回退
+        d = ts.to_datetime64().astype("datetime64[D]")
+        i = int(np.searchsorted(self._sessions, d, side="right")) - 1
+        if i < 0:
+            # 早于日历起点：交给 exchange_calendars 抛 DateOutOfBounds
+            return self.cal.date_to_session(ts, direction="previous").date()
+        return self._sessions[i].astype(object)
 
     def third_friday(self, when: Any = None) -> bool:
         """
         判断 when 是否为其所在月份的“第三个周五”（返回 True/False）。
         """
         d = _as_naive_day(when)
-        tf = _third_friday_of_month(d)
-        return bool(d == tf)
+        tf = third_fridays(np.array([d.year]), np.array([d.month]))[0]
+        return bool(d.to_datetime64().astype("datetime64[D]") == tf)
 
     def trading_days_between(self, start: Any, end: Any) -> int:
         """返回 start 到 end 之间相隔的交易日数量（不含 start，含 end 的位置差）。"""
-        s = _as_naive_day(start)
-        e = _as_naive_day(end)
-        try:
-            # sessions_in_range 返回 DatetimeIndex（无时区）
-            sessions = self.cal.sessions_in_range(s, e)
-            if sessions is None:
-                return 999
-            # 若 start 本身是交易日，sessions 包含 start；我们要“差值”，所以减 1
-            n = int(len(sessions))
-            if n <= 0:
-                return 0
-            if self.is_trading_day(s):
-                return max(0, n - 1)
-            return n
-        except Exception:
+        s = _as_naive_day(start).to_datetime64().astype("datetime64[D]")
+        e = _as_naive_day(end).to_datetime64().astype("datetime64[D]")
+        # 直接在缓存的 datetime64[D] sessions 数组上二分查找（不经过 DatetimeIndex 的 Timestamp 转换）
+        sessions = self._sessions
+        if sessions.size == 0 or s < sessions[0] or e > sessions[-1]:
+            # 超出日历范围（与 sessions_in_range 抛 DateOutOfBounds 时一致）
             return 999
+        lo = int(np.searchsorted(sessions, s, side="left"))
+        hi = int(np.searchsorted(sessions, e, side="right"))
+        n = hi - lo
+        if n <= 0:
+            return 0
+        # 若 start 本身是交易日，区间包含 start；我们要“差值”，所以减 1
+        if lo < sessions.size and sessions[lo] == s:
+            return max(0, n - 1)
+        return n
 
 
 # 兼容旧代码：runner/strategy 里可能使用 TradingCalendar 这个名字
@@ -1,19 +1,29 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
 import os
+import pickle
+import re
 import yaml
 
+try:
+    # libyaml 的 C 实现，解析更快；没装 libyaml 时退回纯 Python 版本
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader as _SafeLoader
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class Symbols:
     portfolio: List[str]
     signal: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FeesBuy:
     commission_per_share: float
     commission_min_usd: float
@@ -22,7 +32,7 @@ class FeesBuy:
     clearing_per_share: float
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FeesSellExtra:
     activity_per_share: float
     activity_min_usd: float
@@ -31,7 +41,7 @@ class FeesSellExtra:
     sec_fee_usd: float
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Params:
     fx_usd_cny: float
     fx_mode: str  # auto | fixed
@@ -49,7 +59,7 @@ class Params:
     weight_ceiling_guardrail: float
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Execution:
     allow_fractional_shares: bool
     fractional_step: float
@@ -57,20 +67,20 @@ class Execution:
     other_fixed_fee_usd: float
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CashPool:
     enabled: bool
-    source: str  # AUTO / MANUAL
+    source: str = field(metadata={"coerce": lambda v: str(v).upper()})  # AUTO / MANUAL
     manual_cny: float
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Broker:
-    mode: str
+    mode: str = field(metadata={"coerce": lambda v: str(v).lower()})
     alpaca_paper: bool
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EmailNotify:
     enabled: bool
     smtp_host: str
@@ -80,20 +90,20 @@ class EmailNotify:
     to_env: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Bootstrap:
     initial_invest_cny: float
     cash_buffer_usd: float
     equal_weight: bool
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AppCfg:
     timezone: str
     base_currency: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Config:
     app: AppCfg
     symbols: Symbols
@@ -113,6 +123,20 @@ def _req(d: Dict[str, Any], key: str) -> Any:
     return d[key]
 
 
+def _cache_path(p: Path) -> Path:
+    """解析结果的 pickle 缓存文件：与 YAML 同目录、每个配置文件固定一个，改配置后原地覆盖。"""
+    return p.parent / f".{p.name}.pkl"
+
+
+def _cache_key(data: bytes) -> str:
+    """缓存校验用的哈希：YAML 内容 + 本模块源码，字段/默认值改动后旧缓存自动失效。"""
+    return hashlib.md5(data + Path(__file__).read_bytes()).hexdigest()
+
+
+# 旧版本按哈希命名的缓存文件（每改一次就多一个），写新缓存时顺手清掉
+_LEGACY_CACHE_RE = re.compile(r"\.config\.[0-9a-f]{32}\.pkl")
+
+
 def load_config(path: str | Path = "config.yaml") -> Config:
     p = Path(path)
     if not p.exists():
@@ -120,89 +144,152 @@ def load_config(path: str | Path = "config.yaml") -> Config:
             f"找不到 {p}. 先复制 config.example.yaml 为 config.yaml 再修改。"
         )
 
-    raw = yaml.safe_load(p.read_text(encoding="utf-8"))
+    # 同一进程内重复加载直接复用（Config 是 frozen 的，共享安全）；文件被修改后 mtime 变化自动失效
+    return _load_config_cached(str(p.resolve()), p.stat().st_mtime_ns)
+
+
+@lru_cache(maxsize=4)
+def _load_config_cached(path_str: str, mtime_ns: int) -> Config:
+    p = Path(path_str)
+    data = p.read_bytes()
+    key = _cache_key(data)
+    cache = _cache_path(p)
+
+    # 缓存里存 (哈希, Config)：哈希对得上才用；缓存损坏/版本不兼容/已过期时静默回退到 YAML
+    if cache.exists():
+        try:
+            cached_key, cfg = pickle.loads(cache.read_bytes())
+            if cached_key == key and isinstance(cfg, Config):
+                return cfg
+        except Exception:
+            pass
+
+    cfg = _build_config(yaml.load(data, Loader=_SafeLoader))
+
+    # 原子写入：先写临时文件再 replace，避免并发运行读到半个文件
+    try:
+        tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(pickle.dumps((key, cfg), protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp, cache)
+        for old in p.parent.glob(".config.*.pkl"):
+            if _LEGACY_CACHE_RE.fullmatch(old.name):
+                old.unlink(missing_ok=True)
+    except Exception:
+        pass
+
+    return cfg
+
+
+_SYMBOLS_DEFAULTS: Dict[str, Any] = {
+    "portfolio": ["IWY", "SPMO", "RSP", "PFF", "VNQ"],
+    "signal": "RSP",
+}
+_PARAMS_DEFAULTS: Dict[str, Any] = {
+    "fx_mode": "fixed",
+    "fx_symbol": "USDCNY=X",
+}
+_EXECUTION_DEFAULTS: Dict[str, Any] = {
+    "allow_fractional_shares": True,
+    "fractional_step": 0.0001,
+    "spread_cost_pct": 0.001,
+    "other_fixed_fee_usd": 0.0,
+}
+_CASH_POOL_DEFAULTS: Dict[str, Any] = {
+    "enabled": True,
+    "source": "AUTO",
+    "manual_cny": 0.0,
+}
+_BROKER_DEFAULTS: Dict[str, Any] = {
+    "mode": "paper",
+    "alpaca_paper": True,
+}
+_EMAIL_DEFAULTS: Dict[str, Any] = {
+    "enabled": False,
+    "smtp_host": "smtp.qq.com",
+    "smtp_port": 465,
+    "smtp_user_env": "SMTP_USER",
+    "smtp_pass_env": "SMTP_PASS",
+    "to_env": "SMTP_TO",
+}
+_BOOTSTRAP_DEFAULTS: Dict[str, Any] = {
+    "initial_invest_cny": 0.0,
+    "cash_buffer_usd": 0.0,
+    "equal_weight": True,
+}
+_APP_DEFAULTS: Dict[str, Any] = {
+    "timezone": "America/New_York",
+    "base_currency": "CNY",
+}
+
+# 注解是字符串（from __future__ import annotations），按字符串映射到转换函数
+_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    "float": float,
+    "int": int,
+    "str": str,
+    "bool": bool,
+    "List[str]": list,
+}
+_COERCERS: Dict[type, Callable[[Dict[str, Any], Dict[str, Any]], Any]] = {}
+
+
+def _get(d: Dict[str, Any], defaults: Dict[str, Any], key: str) -> Any:
+    if key in d:
+        return d[key]
+    if key in defaults:
+        return defaults[key]
+    raise KeyError(f"Missing config key: {key}")
+
+
+def _make_coercer(cls: type) -> Callable[[Dict[str, Any], Dict[str, Any]], Any]:
+    """按 dataclass 字段生成一次构造函数：cls(f=conv(_get(raw, defaults, "f")), ...)。"""
+    ns: Dict[str, Any] = {"cls": cls, "_get": _get}
+    args = []
+    for name, f in cls.__dataclass_fields__.items():
+        conv = f.metadata.get("coerce") or _CONVERTERS[str(f.type)]
+        ns[f"_conv_{name}"] = conv
+        args.append(f"{name}=_conv_{name}(_get(raw, defaults, {name!r}))")
+    src = "def _coerce(raw, defaults):\n    return cls(" + ", ".join(args) + ")\n"
+    exec(compile(src, f"<coerce {cls.__name__}>", "exec"), ns)
+    return ns["_coerce"]
+
+
+def _coerce(cls: type, raw: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None) -> Any:
+    fn = _COERCERS.get(cls)
+    if fn is None:
+        fn = _COERCERS[cls] = _make_coercer(cls)
+    return fn(raw, defaults or {})
+
+
+def _build_config(raw: Dict[str, Any] | None) -> Config:
+    raw = raw or {}
 
-    app = raw.get("app", {})
-    symbols = raw.get("symbols", {})
     params = raw.get("params", {})
-    execution = raw.get("execution", {})
-    cash_pool = raw.get("cash_pool", {})
     fees = raw.get("fees", {})
     broker = raw.get("broker", {})
-    bootstrap = raw.get("bootstrap", {})
     notify = raw.get("notify", {})
-    email = notify.get("email", {})
 
-    cfg = Config(
-        app=AppCfg(
-            timezone=str(app.get("timezone", "America/New_York")),
-            base_currency=str(app.get("base_currency", "CNY")),
-        ),
-        symbols=Symbols(
-            portfolio=list(symbols.get("portfolio", ["IWY", "SPMO", "RSP", "PFF", "VNQ"])),
-            signal=str(symbols.get("signal", "RSP")),
-        ),
-        params=Params(
-            fx_usd_cny=float(_req(params, "fx_usd_cny")),
-            fx_mode=str(params.get("fx_mode", "fixed")),
-            fx_symbol=str(params.get("fx_symbol", "USDCNY=X")),
-            fx_fallback_usd_cny=float(params.get("fx_fallback_usd_cny", _req(params, "fx_usd_cny"))),
-            invest_cny_per_trade=float(_req(params, "invest_cny_per_trade")),
-            first_buy_ratio_below_ma200=float(_req(params, "first_buy_ratio_below_ma200")),
-            first_daily_drop_threshold=float(_req(params, "first_daily_drop_threshold")),
-            second_drawdown_threshold=float(_req(params, "second_drawdown_threshold")),
-            third_drawdown_threshold=float(_req(params, "third_drawdown_threshold")),
-            cooldown_trading_days=int(_req(params, "cooldown_trading_days")),
-            max_trades_per_month=int(_req(params, "max_trades_per_month")),
-            target_weight_each=float(_req(params, "target_weight_each")),
-            weight_floor_guardrail=float(_req(params, "weight_floor_guardrail")),
-            weight_ceiling_guardrail=float(_req(params, "weight_ceiling_guardrail")),
+    return Config(
+        app=_coerce(AppCfg, raw.get("app", {}), _APP_DEFAULTS),
+        symbols=_coerce(Symbols, raw.get("symbols", {}), _SYMBOLS_DEFAULTS),
+        params=_coerce(
+            Params,
+            params,
+            {**_PARAMS_DEFAULTS, "fx_fallback_usd_cny": params.get("fx_usd_cny")},
         ),
-        execution=Execution(
-            allow_fractional_shares=bool(execution.get("allow_fractional_shares", True)),
-            fractional_step=float(execution.get("fractional_step", 0.0001)),
-            spread_cost_pct=float(execution.get("spread_cost_pct", 0.001)),
-            other_fixed_fee_usd=float(execution.get("other_fixed_fee_usd", 0.0)),
-        ),
-        cash_pool=CashPool(
-            enabled=bool(cash_pool.get("enabled", True)),
-            source=str(cash_pool.get("source", "AUTO")).upper(),
-            manual_cny=float(cash_pool.get("manual_cny", 0.0)),
-        ),
-        fees_buy=FeesBuy(
-            commission_per_share=float(_req(_req(fees, "buy"), "commission_per_share")),
-            commission_min_usd=float(_req(_req(fees, "buy"), "commission_min_usd")),
-            platform_per_share=float(_req(_req(fees, "buy"), "platform_per_share")),
-            platform_min_usd=float(_req(_req(fees, "buy"), "platform_min_usd")),
-            clearing_per_share=float(_req(_req(fees, "buy"), "clearing_per_share")),
-        ),
-        fees_sell_extra=FeesSellExtra(
-            activity_per_share=float(_req(_req(fees, "sell_extra"), "activity_per_share")),
-            activity_min_usd=float(_req(_req(fees, "sell_extra"), "activity_min_usd")),
-            activity_max_usd=float(_req(_req(fees, "sell_extra"), "activity_max_usd")),
-            cat_per_share=float(_req(_req(fees, "sell_extra"), "cat_per_share")),
-            sec_fee_usd=float(_req(_req(fees, "sell_extra"), "sec_fee_usd")),
-        ),
-        broker=Broker(
-            mode=str(broker.get("mode", "paper")).lower(),
-            alpaca_paper=bool(broker.get("alpaca", {}).get("paper", True)),
-        ),
-        email=EmailNotify(
-            enabled=bool(email.get("enabled", False)),
-            smtp_host=str(email.get("smtp_host", "smtp.qq.com")),
-            smtp_port=int(email.get("smtp_port", 465)),
-            smtp_user_env=str(email.get("smtp_user_env", "SMTP_USER")),
-            smtp_pass_env=str(email.get("smtp_pass_env", "SMTP_PASS")),
-            to_env=str(email.get("to_env", "SMTP_TO")),
-        ),
-        bootstrap=Bootstrap(
-            initial_invest_cny=float(bootstrap.get("initial_invest_cny", 0.0)),
-            cash_buffer_usd=float(bootstrap.get("cash_buffer_usd", 0.0)),
-            equal_weight=bool(bootstrap.get("equal_weight", True)),
+        execution=_coerce(Execution, raw.get("execution", {}), _EXECUTION_DEFAULTS),
+        cash_pool=_coerce(CashPool, raw.get("cash_pool", {}), _CASH_POOL_DEFAULTS),
+        fees_buy=_coerce(FeesBuy, _req(fees, "buy")),
+        fees_sell_extra=_coerce(FeesSellExtra, _req(fees, "sell_extra")),
+        broker=_coerce(
+            Broker,
+            {**broker, "alpaca_paper": broker.get("alpaca", {}).get("paper", True)},
+            _BROKER_DEFAULTS,
         ),
+        email=_coerce(EmailNotify, notify.get("email", {}), _EMAIL_DEFAULTS),
+        bootstrap=_coerce(Bootstrap, raw.get("bootstrap", {}), _BOOTSTRAP_DEFAULTS),
     )
 
-    return cfg
+
 def env_or_none(name: str) -> Optional[str]:
     v = os.environ.get(name)
     if v is None or str(v).strip() == "":
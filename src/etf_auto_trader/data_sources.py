@@ -1,63 +1,165 @@
 from __future__ import annotations
 
-import datetime as dt
 import os
-from typing import Any, Dict, Iterable, Optional
-
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
 import pandas as pd
-import yfinance as yf
 
+from .calendar_utils import TradingCalendar, _as_naive_day
+from .config import Config
 
-def _today() -> pd.Timestamp:
-    return pd.Timestamp.today().normalize()
 
+_yf: Any = None
 
-def _as_naive_day(x: Any) -> pd.Timestamp:
-    """把输入转成无时区日期（00:00:00）。遇到无效值回退到今天。"""
 
-    if x is None:
-        return _today()
+def _get_yf() -> Any:
+    """首次真正联网时才 import yfinance；离线/命中缓存的运行不付这笔导入开销。"""
+    global _yf
+    if _yf is None:
+        import yfinance
 
-    if isinstance(x, pd.Timestamp):
-        ts = x
-    elif isinstance(x, dt.datetime):
-        ts = pd.Timestamp(x)
-    elif isinstance(x, dt.date):
-        ts = pd.Timestamp(x)
-    elif isinstance(x, str):
-        s = x.strip()
-        if s in ("", "auto", "AUTO", "today", "TODAY", "暂定", "TBD", "tbd"):
-            return _today()
-        try:
-            ts = pd.Timestamp(s)
-        except Exception:
-            return _today()
-    else:
+        _yf = yfinance
+    return _yf
+
+
+_YF_SESSION: Any = None
+
+
+def _yf_session() -> Any:
+    """所有 yfinance 请求共用一个 Session：复用 TCP/TLS 连接，不再每次下载重新握手。
+
+    优先用 yfinance 自己偏好的 curl_cffi 后端；没有时退回 requests，并挂上连接池和 429/5xx 重试。
+    """
+    global _YF_SESSION
+    if _YF_SESSION is None:
         try:
-            ts = pd.Timestamp(x)
-        except Exception:
-            return _today()
+            from curl_cffi import requests as cffi_requests  # type: ignore
+
+            _YF_SESSION = cffi_requests.Session(impersonate="chrome")
+        except ImportError:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            session = requests.Session()
+            retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+            session.mount("https://", HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=retry))
+            _YF_SESSION = session
+    return _YF_SESSION
+
+
+# 发往 Yahoo 的请求限速：任意 _RATE_PERIOD 秒内最多 _RATE_MAX_CALLS 次（线程间共享）
+_RATE_MAX_CALLS = 5
+_RATE_PERIOD = 2.0
+_rate_lock = threading.Lock()
+_rate_calls: Deque[float] = deque()
+
+# 被限流时的指数退避：1s, 2s, 4s ...（上限 30s），最多尝试 4 次
+_BACKOFF_ATTEMPTS = 4
+_BACKOFF_MIN = 1.0
+_BACKOFF_MAX = 30.0
+
+
+def _throttle() -> None:
+    """阻塞到当前窗口还有额度为止。
+
+    锁内只算出本次请求可以发出的时刻并占住这个名额（_rate_calls 只保留最近 _RATE_MAX_CALLS 个），
+    真正的 sleep 在锁外，线程池里的其它线程不用排队等锁。
+    """
+    with _rate_lock:
+        now = time.monotonic()
+        if len(_rate_calls) >= _RATE_MAX_CALLS:
+            slot = max(now, _rate_calls[0] + _RATE_PERIOD)
+            _rate_calls.popleft()
+        else:
+            slot = now
+        _rate_calls.append(slot)
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def _is_rate_limited(err: Any) -> bool:
+    text = f"{type(err).__name__} {err}"
+    return "RateLimit" in text or "Too Many Requests" in text or "429" in text
+
+
+def _download_rate_limited(symbols: List[str]) -> bool:
+    """yf.download 不抛异常，限流只记在 yfinance.shared._ERRORS 里（私有属性：拿不到或类型不对时当作没限流）。"""
+    errors = getattr(getattr(_get_yf(), "shared", None), "_ERRORS", None)
+    if not isinstance(errors, dict):
+        return False
+    return any(_is_rate_limited(errors.get(s.upper(), "")) for s in symbols)
 
-    if getattr(ts, "tzinfo", None) is not None:
-        ts = ts.tz_convert(None)
-    return ts.normalize()
+
+def _yf_call(call: Callable[[], Any], symbols: List[str]) -> Any:
+    """限速地调用一次 yfinance；遇到限流（异常或 _ERRORS 记录）按指数退避重试。"""
+    delay = _BACKOFF_MIN
+    for attempt in range(1, _BACKOFF_ATTEMPTS + 1):
+        _throttle()
+        try:
+            result = call()
+        except Exception as e:
+            if attempt == _BACKOFF_ATTEMPTS or not _is_rate_limited(e):
+                raise
+        else:
+            if attempt == _BACKOFF_ATTEMPTS or not _download_rate_limited(symbols):
+                return result
+        time.sleep(delay)
+        delay = min(delay * 2, _BACKOFF_MAX)
 
 
 def _last_valid_value(s: pd.Series) -> float:
     if s is None:
         return float("nan")
-    s2 = s.dropna()
-    if s2.empty:
-        return float("nan")
     try:
-        return float(s2.iloc[-1])
+        # 浮点列直接拿底层数组（不复制）；其它 dtype 才需要转换并把缺失值换成 NaN
+        if s.dtype.kind == "f":
+            arr = s.to_numpy()
+        else:
+            arr = s.to_numpy(dtype=np.float64, na_value=np.nan)
     except Exception:
         return float("nan")
+    return _last_valid(arr)
+
+
+# 先只看末尾这么多个值：最后一个有效值几乎总在最后一行
+_LAST_VALID_PROBE = 8
+
+
+def _last_valid(arr: np.ndarray) -> float:
+    """ndarray 中最后一个非 NaN 值；没有则返回 NaN。"""
+    for v in arr[-_LAST_VALID_PROBE:][::-1]:
+        if v == v:
+            return float(v)
+    valid = np.flatnonzero(~np.isnan(arr[:-_LAST_VALID_PROBE]))
+    if valid.size == 0:
+        return float("nan")
+    return float(arr[valid[-1]])
+
+
+# title() 之后再修正的 Adj Close 写法（Adjclose / Adj. Close），一次替换。
+# Adj_close 经 title() 已变成 Adj_Close、不会命中，与原先逐个 replace 的结果保持一致
+_ADJ_CLOSE_RE = re.compile(r"Adjclose|Adj\. Close")
+# yfinance 通常直接给出这些列名；全部命中时 _normalize_columns 无事可做
+_CANONICAL_COLUMNS = frozenset(
+    {"Open", "High", "Low", "Close", "Adj Close", "Volume", "Dividends", "Stock Splits", "Capital Gains"}
+)
 
 
 def _normalize_columns(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
     """统一列名并剥掉 ticker 后缀（例如 'Close Rsp' -> 'Close'）。"""
 
+    if not isinstance(df.columns, pd.MultiIndex) and _CANONICAL_COLUMNS.issuperset(df.columns):
+        return df
+
     sym = str(symbol).strip()
     sym_upper = sym.upper()
     sym_title = sym.title()
@@ -70,27 +172,16 @@ def _normalize_columns(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
             flattened.append(" ".join(parts).strip())
         df.columns = flattened
 
-    cols = [str(c).strip().title() for c in df.columns]
-
-    def fix_adj(c: str) -> str:
-        return (
-            c.replace("Adjclose", "Adj Close")
-            .replace("Adj_close", "Adj Close")
-            .replace("Adj. Close", "Adj Close")
-        )
-
-    cols = [fix_adj(c) for c in cols]
-
-    stripped = []
-    for c in cols:
-        c_strip = c.strip()
-        for suf in (f" {sym_title}", f" {sym_upper}", f" {sym}"):
-            if c_strip.endswith(suf):
-                c_strip = c_strip[: -len(suf)].strip()
-                break
-        stripped.append(c_strip)
-
-    df.columns = stripped
+    # 一条 Index.str 流水线完成 strip/title/Adj Close 修正/去 ticker 后缀
+    suffix = " (?:" + "|".join(re.escape(x) for x in (sym_title, sym_upper, sym)) + ")$"
+    df.columns = (
+        pd.Index(df.columns).astype(str)
+        .str.strip()
+        .str.title()
+        .str.replace(_ADJ_CLOSE_RE, "Adj Close", regex=True)
+        .str.replace(suffix, "", n=1, regex=True)
+        .str.strip()
+    )
     return df
 
 
@@ -101,7 +192,7 @@ def _synthetic_history(symbol: str, asof: pd.Timestamp) -> pd.DataFrame:
     idx = pd.bdate_range(end=asof, periods=520)
     base = 100.0
     step = 0.05
-    close = pd.Series([base + step * i for i in range(len(idx))], index=idx)
+    close = base + step * np.arange(len(idx), dtype=np.float64)
     df = pd.DataFrame(
         {
             "Open": close * 0.999,
@@ -109,49 +200,187 @@ def _synthetic_history(symbol: str, asof: pd.Timestamp) -> pd.DataFrame:
             "Low": close * 0.998,
             "Close": close,
             "Adj Close": close,
-            "Volume": 1_000_000,
+            "Volume": np.full(len(idx), 1_000_000, dtype=np.int64),
         },
-        index=idx,
+        index=idx.normalize(),
     )
-    df.index = df.index.normalize()
+    # 标记为合成数据：prefetch 不会把它当成真实行情留在内存里
+    df.attrs["synthetic"] = True
+    return df
+
+
+# 行情缓存目录；可用环境变量 ETF_CACHE_DIR 指到别处（例如多个工作目录共享一份）
+CACHE_DIR = Path(os.environ.get("ETF_CACHE_DIR", "data/cache")).expanduser()
+# 本地历史至少要从 start 往后这么多天内开始，才算覆盖了请求窗口（start 可能落在周末/假日）
+_HISTORY_START_SLACK = pd.Timedelta(days=7)
+
+
+def _history_file(symbol: str) -> Path:
+    safe = str(symbol).strip().replace("/", "_")
+    # 降精度的帧单独缓存，开关切换后不会读到另一种 dtype
+    tag = "_f32" if _downcast_enabled() else ""
+    return CACHE_DIR / f"{safe}{tag}.pkl"
+
+
+def _cache_enabled() -> bool:
+    return str(os.environ.get("ETF_NO_CACHE", "")).strip() != "1"
+
+
+def _read_history(symbol: str) -> Optional[pd.DataFrame]:
+    """读取该标的在本地累积的日线；不存在/损坏都返回 None。"""
+
+    if not _cache_enabled():
+        return None
+    try:
+        df = pd.read_pickle(_history_file(symbol))
+    except Exception:
+        return None
+    if not isinstance(df, pd.DataFrame) or df.empty or not isinstance(df.index, pd.DatetimeIndex):
+        return None
     return df
 
 
-def _download_yf_one(symbol: str, asof_date: Any) -> pd.DataFrame:
-    """下载单一标的日线（失败时用 period 或合成数据兜底）。"""
+def _write_history(symbol: str, df: pd.DataFrame) -> None:
+    if not _cache_enabled():
+        return
+    path = _history_file(symbol)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        df.to_pickle(tmp)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+
+
+def _history_fetch_start(
+    hist: Optional[pd.DataFrame], start_ts: pd.Timestamp, asof: pd.Timestamp
+) -> Optional[pd.Timestamp]:
+    """本地历史在 asof 之后还有 K 线（asof 当天已定稿）时返回 None；否则返回需要联网补拉的起点。"""
+
+    if hist is None or hist.index.min() > start_ts + _HISTORY_START_SLACK:
+        return start_ts
+    last = hist.index.max()
+    if last > asof:
+        return None
+    # 最后一根（包括 asof 当天那根）可能是盘中未定稿的收盘：总是从它开始重拉，由 _merge_history 覆盖
+    return last
+
+
+def _merge_history(symbol: str, hist: Optional[pd.DataFrame], new: pd.DataFrame) -> pd.DataFrame:
+    """把新下载的日线并进本地历史（同一天以新数据为准）并写回。"""
+
+    if hist is None:
+        merged = new
+    else:
+        merged = pd.concat([hist, new])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+    _write_history(symbol, merged)
+    return merged
+
+
+# 最近一次 prefetch() 的结果：(symbol, asof, lookback_days) -> 日线；本进程内后续下载直接命中
+_PREFETCHED: Dict[Tuple[str, pd.Timestamp, int], pd.DataFrame] = {}
+# 默认下载窗口（自然日）：MA200 需要 200 个交易日，再留出余量
+LOOKBACK_DAYS = 450
+# 单次 yf.download 最多合并的标的数
+BATCH_SIZE = 20
+# 逐只下载时的并发线程数（限速器仍然把总请求数压在 _RATE_MAX_CALLS/_RATE_PERIOD 以内）
+MAX_WORKERS = 6
+
+
+def prefetch(symbols: Iterable[str], asof_date: Any) -> None:
+    """把一次运行要用的标的合并成批量请求预先拉好，之后 fetch_* 直接用内存结果。"""
 
     asof = _as_naive_day(asof_date)
-    start_ts = (asof - pd.Timedelta(days=450)).normalize()
+    syms = list(dict.fromkeys(str(s) for s in symbols))
+    frames = _download_yf_many(syms, asof)
+    # 只保留这一次运行的结果；联网失败得到的合成数据不留，之后的调用还会重试
+    _PREFETCHED.clear()
+    for s, df in frames.items():
+        if not df.attrs.get("synthetic"):
+            _PREFETCHED[(s, asof, LOOKBACK_DAYS)] = df
+
+
+class _NoHistory(Exception):
+    """联网拿不到日线：由 _download_yf_one 兜底成合成数据（异常不进 lru 缓存，下次还会重试）。"""
+
+
+def _download_yf_one(symbol: str, asof_date: Any, lookback_days: int = LOOKBACK_DAYS) -> pd.DataFrame:
+    """下载单一标的日线（失败时用 period 或合成数据兜底）。
+
+    同一进程内同一 (symbol, asof, lookback_days) 只下载一次；返回浅拷贝（预取命中也一样），
+    调用方改列名/索引不会污染缓存。
+    """
+
+    key = (str(symbol), _as_naive_day(asof_date), int(lookback_days))
+    hit = _PREFETCHED.get(key)
+    if hit is not None:
+        return hit.copy(deep=False)
+    try:
+        return _download_yf_one_cached(*key).copy(deep=False)
+    except _NoHistory:
+        return _synthetic_history(key[0], key[1])
+
+
+@lru_cache(maxsize=256)
+def _download_yf_one_cached(symbol: str, asof: pd.Timestamp, lookback_days: int) -> pd.DataFrame:
+    start_ts = (asof - pd.Timedelta(days=lookback_days)).normalize()
     end_ts = (asof + pd.Timedelta(days=1)).normalize()  # end 开区间
 
     # 预跑/离线模式：跳过网络请求，直接返回合成数据
     if str(os.environ.get("ETF_OFFLINE", "")).strip() == "1":
         return _synthetic_history(symbol, asof)
 
+    hist = _read_history(symbol)
+    fetch_from = _history_fetch_start(hist, start_ts, asof)
+    if fetch_from is None:
+        return hist.loc[start_ts:asof]
+
     df: Optional[pd.DataFrame] = None
     try:
-        df = yf.download(
-            symbol,
-            start=start_ts.strftime("%Y-%m-%d"),
-            end=end_ts.strftime("%Y-%m-%d"),
-            interval="1d",
-            progress=False,
-            auto_adjust=False,
-            actions=False,
-            threads=False,
+        df = _yf_call(
+            lambda: _get_yf().download(
+                symbol,
+                start=fetch_from.strftime("%Y-%m-%d"),
+                end=end_ts.strftime("%Y-%m-%d"),
+                interval="1d",
+                progress=False,
+                auto_adjust=False,
+                actions=False,
+                threads=False,
+                session=_yf_session(),
+            ),
+            [symbol],
         )
     except Exception:
         df = None
 
+    if (df is None or df.empty) and fetch_from > start_ts:
+        # 只是增量补拉没拿到新数据（假日/网络抖动）：本地历史已覆盖窗口，直接用
+        return hist.loc[start_ts:asof]
+
     if df is None or df.empty:
         try:
-            df = yf.Ticker(symbol).history(period="2y", interval="1d", auto_adjust=False)
+            df = _yf_call(
+                lambda: _get_yf()
+                .Ticker(symbol, session=_yf_session())
+                .history(period="2y", interval="1d", auto_adjust=False),
+                [symbol],
+            )
         except Exception:
             df = None
 
     if df is None or df.empty:
-        # 兜底：合成数据，让本地预跑能继续。
-        return _synthetic_history(symbol, asof)
+        # 兜底：由调用方换成合成数据，让本地预跑能继续（不写本地历史，也不进 lru 缓存）。
+        raise _NoHistory(symbol)
+
+    df = _merge_history(symbol, hist, _finalize_frame(df, symbol))
+    return df.loc[start_ts:asof]
+
+
+def _finalize_frame(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """统一列名，索引去时区并归一化到日期。"""
 
     df = _normalize_columns(df, symbol=symbol)
 
@@ -161,11 +390,122 @@ def _download_yf_one(symbol: str, asof_date: Any) -> pd.DataFrame:
             idx = idx.tz_convert(None)
         df.index = idx.normalize()
 
+    if _downcast_enabled():
+        df = _downcast(df)
     return df
 
 
+_PRICE_COLUMNS = ("Open", "High", "Low", "Close", "Adj Close")
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+def _downcast_enabled() -> bool:
+    # 默认保持 float64；设 ETF_DTYPE_DOWNCAST=1 时价格列转 float32、成交量转 int32，内存减半
+    return str(os.environ.get("ETF_DTYPE_DOWNCAST", "")).strip() == "1"
+
+
+def _downcast(df: pd.DataFrame) -> pd.DataFrame:
+    casts: Dict[str, str] = {c: "float32" for c in _PRICE_COLUMNS if c in df.columns}
+    if "Volume" in df.columns:
+        vol = df["Volume"]
+        # 有缺失或超出 int32 范围时保留原 dtype
+        if not vol.isna().any() and (vol.empty or vol.max() <= _INT32_MAX):
+            casts["Volume"] = "int32"
+    return df.astype(casts, copy=False) if casts else df
+
+
+def _download_each(symbols: List[str], asof_date: Any) -> Dict[str, pd.DataFrame]:
+    """逐只调用 _download_yf_one；多只时用线程池并发（网络 I/O 期间会释放 GIL）。
+
+    单只下载用 threads=False，线程池是这里唯一的并发来源，避免和 yfinance 内部线程叠加。
+    """
+
+    if len(symbols) <= 1:
+        return {s: _download_yf_one(s, asof_date) for s in symbols}
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(symbols))) as ex:
+        frames = ex.map(lambda s: _download_yf_one(s, asof_date), symbols)
+        return dict(zip(symbols, frames))
+
+
+def _download_yf_many(symbols: List[str], asof_date: Any) -> Dict[str, pd.DataFrame]:
+    """按 BATCH_SIZE 分批 yf.download 拉取多只标的日线；某只缺失时回退到 _download_yf_one（并发）。"""
+
+    asof = _as_naive_day(asof_date)
+    start_ts = (asof - pd.Timedelta(days=LOOKBACK_DAYS)).normalize()
+    end_ts = (asof + pd.Timedelta(days=1)).normalize()  # end 开区间
+
+    out: Dict[str, pd.DataFrame] = {}
+    for s in symbols:
+        hit = _PREFETCHED.get((s, asof, LOOKBACK_DAYS))
+        if hit is not None:
+            out[s] = hit.copy(deep=False)
+    missing = [s for s in symbols if s not in out]
+
+    if len(missing) <= 1 or str(os.environ.get("ETF_OFFLINE", "")).strip() == "1":
+        out.update(_download_each(missing, asof))
+        return {s: out[s] for s in symbols}
+
+    # 本地历史已覆盖的直接切片；其余记下各自需要补拉的起点
+    hists: Dict[str, Optional[pd.DataFrame]] = {}
+    fetch_from: Dict[str, pd.Timestamp] = {}
+    for s in missing:
+        hist = _read_history(s)
+        start = _history_fetch_start(hist, start_ts, asof)
+        if start is None:
+            out[s] = hist.loc[start_ts:asof]
+        else:
+            hists[s] = hist
+            fetch_from[s] = start
+    missing = [s for s in missing if s not in out]
+
+    retry: List[str] = []
+    for i in range(0, len(missing), BATCH_SIZE):
+        batch = missing[i : i + BATCH_SIZE]
+        # 一批只发一个请求：从这批里最早的补拉起点开始
+        batch_start = min(fetch_from[s] for s in batch)
+        raw: Optional[pd.DataFrame] = None
+        try:
+            raw = _yf_call(
+                lambda: _get_yf().download(
+                    " ".join(batch),
+                    start=batch_start.strftime("%Y-%m-%d"),
+                    end=end_ts.strftime("%Y-%m-%d"),
+                    interval="1d",
+                    group_by="ticker",
+                    progress=False,
+                    auto_adjust=False,
+                    actions=False,
+                    threads=True,
+                    session=_yf_session(),
+                ),
+                batch,
+            )
+        except Exception:
+            raw = None
+
+        for s in batch:
+            df: Optional[pd.DataFrame] = None
+            if raw is not None and isinstance(raw.columns, pd.MultiIndex) and s in raw.columns.get_level_values(0):
+                df = raw[s].dropna(how="all")
+            if df is not None and not df.empty:
+                out[s] = _merge_history(s, hists[s], _finalize_frame(df, s)).loc[start_ts:asof]
+            elif fetch_from[s] > start_ts:
+                # 增量补拉没拿到新数据：本地历史已覆盖窗口
+                out[s] = hists[s].loc[start_ts:asof]
+            else:
+                retry.append(s)
+
+    out.update(_download_each(retry, asof))
+    return {s: out[s] for s in symbols}
+
+
 class MarketData:
-    """给 runner/strategy 用的信号数据封装（字段都返回 float）。"""
+    """给 runner/strategy 用的信号数据封装（字段都返回 float）。
+
+    df 在构造后视为只读：各派生值首次访问时计算并缓存。
+    """
+
+    _CLOSE_CANDIDATES = ("Close", "Adj Close", "收盘", "关闭", "接近")
 
     def __init__(self, df: pd.DataFrame):
         self.df = df
@@ -176,28 +516,50 @@ class MarketData:
                 return self.df[c]
         raise KeyError(f"找不到列：{candidates}，当前列名={list(self.df.columns)}")
 
-    @property
+    @cached_property
     def close_series(self) -> pd.Series:
-        return self._pick_col("Close", "Adj Close", "收盘", "关闭", "接近")
+        return self._pick_col(*self._CLOSE_CANDIDATES)
 
-    @property
+    @cached_property
+    def _closes(self) -> np.ndarray:
+        s = self.close_series
+        # float64 列直接是底层数组的视图（不复制）；其它 dtype 才转换并把缺失值换成 NaN
+        if s.dtype == np.float64:
+            return s.to_numpy(copy=False)
+        return s.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    @cached_property
     def close(self) -> float:
-        return _last_valid_value(self.close_series)
+        return _last_valid(self._closes)
 
-    @property
+    @cached_property
     def prev_close(self) -> float:
-        return _last_valid_value(self.close_series.shift(1))
+        # 等价于 shift(1) 后取最后有效值：即去掉最后一行后的最后有效收盘
+        return _last_valid(self._closes[:-1])
 
-    @property
+    @cached_property
     def MA200(self) -> float:
-        ma = self.close_series.rolling(window=200, min_periods=200).mean()
-        return _last_valid_value(ma)
+        # 只需要最后一个窗口：末尾 200 个收盘都有效时直接取均值，避免整列 rolling
+        closes = self._closes
+        if closes.size < 200:
+            return float("nan")
+        tail = closes[-200:]
+        if not np.isnan(tail).any():
+            return float(tail.mean())
+        # 有缺失时取最后一个 200 根全有效的窗口（等价 rolling(200, min_periods=200) 的最后有效值），不建整列 rolling
+        nan_count = np.cumsum(np.isnan(closes))
+        window_nans = nan_count[199:] - np.concatenate(([0], nan_count[:-200]))
+        ends = np.flatnonzero(window_nans == 0)
+        if ends.size == 0:
+            return float("nan")
+        end = int(ends[-1]) + 200
+        return float(closes[end - 200 : end].mean())
 
     @property
     def ma200(self) -> float:
         return self.MA200
 
-    @property
+    @cached_property
     def month_high_close(self) -> float:
         if self.df is None or self.df.empty:
             return float("nan")
@@ -207,14 +569,17 @@ class MarketData:
         last_dt = idx.max()
         if pd.isna(last_dt):
             return float("nan")
-        mask = (idx.year == last_dt.year) & (idx.month == last_dt.month)
-        m = self.close_series.loc[mask]
-        if m.empty:
-            return float("nan")
-        try:
-            return float(m.max())
-        except Exception:
+        if idx.is_monotonic_increasing:
+            # 按时间排好序（常见情况）：二分到本月 1 号，只看当月尾段
+            start = int(idx.searchsorted(pd.Timestamp(last_dt.year, last_dt.month, 1)))
+            m = self._closes[start:]
+        else:
+            mask = (idx.year == last_dt.year) & (idx.month == last_dt.month)
+            m = self._closes[mask]
+        m = m[~np.isnan(m)]
+        if m.size == 0:
             return float("nan")
+        return float(m.max())
 
 
 def fetch_signal_inputs(signal_symbol: str, *args: Any, **kwargs: Any) -> MarketData:
@@ -246,45 +611,102 @@ def fetch_prices(tickers: Iterable[str], asof_date: Any) -> Dict[str, float]:
     else:
         tick_list = list(tickers)
 
+    frames = _download_yf_many(tick_list, asof_date)
+    return {t: _last_close(frames[t]) for t in tick_list}
+
+
+def _last_close(df: pd.DataFrame) -> float:
+    if "Close" in df.columns:
+        return _last_valid_value(df["Close"])
+    if "Adj Close" in df.columns:
+        return _last_valid_value(df["Adj Close"])
+    # 极端情况下回退到第一列
+    return _last_valid_value(df.iloc[:, 0]) if not df.empty else 0.0
+
+
+def cached_prices(tickers: Iterable[str], asof_date: Any) -> Dict[str, float]:
+    """只读本地历史缓存、不联网：各标的在 asof 当天或之前的最后收盘。
+
+    只接受日期不早于 asof 当天（或之前最近一个交易日）的收盘，缓存太旧就当作没有；
+    本地没有（或拿不到有效收盘）的标的不出现在结果里，由调用方联网补；离线模式下总是返回空 dict。
+    """
+
+    if str(os.environ.get("ETF_OFFLINE", "")).strip() == "1":
+        return {}
+    asof = _as_naive_day(asof_date)
+    try:
+        fresh_from = pd.Timestamp(TradingCalendar().last_trading_day(asof))
+    except Exception:
+        fresh_from = asof
     out: Dict[str, float] = {}
-    for t in tick_list:
-        df = _download_yf_one(t, asof_date)
-        if "Close" in df.columns:
-            out[t] = _last_valid_value(df["Close"])
-        elif "Adj Close" in df.columns:
-            out[t] = _last_valid_value(df["Adj Close"])
-        else:
-            # 极端情况下回退到第一列
-            out[t] = _last_valid_value(df.iloc[:, 0]) if not df.empty else 0.0
+    for t in tickers:
+        hist = _read_history(t)
+        if hist is None:
+            continue
+        v = _last_close(hist.loc[fresh_from:asof])
+        if v > 0:
+            out[t] = v
     return out
 
 
-def fetch_fx_usdcny(
-    asof_date: Any,
-    *,
-    symbol: str = "USDCNY=X",
-    fallback: Optional[float] = None,
-) -> float:
-    """返回：1 USD 兑多少 CNY。失败时返回 fallback（若提供）。"""
+# 汇率下载窗口（自然日）：覆盖长假也能拿到最近一个收盘
+_FX_LOOKBACK_DAYS = 10
+
 
-    candidates = [symbol]
-    # 常见备选
-    for s in ("USDCNY=X", "CNY=X"):
-        if s not in candidates:
-            candidates.append(s)
+@lru_cache(maxsize=64)
+def _fx_usdcny_cached(asof_day: pd.Timestamp, symbol: str) -> float:
+    """按 (日期, 主符号) 记住拉到的汇率；拉不到时抛 LookupError（失败不进缓存，下次还会重试）。"""
 
-    for sym in candidates:
+    # 主符号 + 常见备选（去重保序）
+    for sym in dict.fromkeys((symbol, "USDCNY=X", "CNY=X")):
         try:
-            df = _download_yf_one(sym, asof_date)
-            if "Close" in df.columns and not df["Close"].dropna().empty:
-                v = float(df["Close"].dropna().iloc[-1])
-                # 极端错误值保护
+            # 只需要最后一个收盘：拉最近几天即可，不必下载 450 天历史
+            df = _download_yf_one(sym, asof_day, lookback_days=_FX_LOOKBACK_DAYS)
+            if "Close" in df.columns:
+                v = _last_valid_value(df["Close"])
+                # 极端错误值保护（NaN 也不会通过）
                 if v > 0:
                     return v
         except Exception:
             continue
 
+    raise LookupError(symbol)
+
+
+def fetch_fx_usdcny(
+    asof_date: Any,
+    *,
+    symbol: str = "USDCNY=X",
+    fallback: Optional[float] = None,
+) -> float:
+    """返回：1 USD 兑多少 CNY。失败时返回 fallback（若提供）。同一天重复调用直接用内存结果。"""
+
+    try:
+        return _fx_usdcny_cached(_as_naive_day(asof_date), symbol)
+    except LookupError:
+        pass
+
     if fallback is not None:
         return float(fallback)
 
     raise RuntimeError("无法获取 USD/CNY 汇率（yfinance）。")
+
+
+def resolve_fx_usdcny(cfg: Config, asof_date: Any, *, prefer_cache: bool = False) -> float:
+    """按 params.fx_mode 取当次使用的 USD/CNY：fixed 直接用配置值（不碰网络），auto 才去拉行情。
+
+    prefer_cache=True 时先用本地缓存里 asof 当天（或最近一个交易日）的汇率（只用于展示的场景），没有或太旧再联网。
+    """
+
+    fx_rate = cfg.params.fx_usd_cny
+    if str(cfg.params.fx_mode).lower() != "auto":
+        return float(fx_rate)
+    if prefer_cache:
+        cached = cached_prices([cfg.params.fx_symbol], asof_date)
+        if cached:
+            return cached[cfg.params.fx_symbol]
+    return fetch_fx_usdcny(
+        asof_date,
+        symbol=cfg.params.fx_symbol,
+        fallback=cfg.params.fx_fallback_usd_cny,
+    )
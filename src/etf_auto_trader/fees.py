@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
 
 
 @dataclass(frozen=True)
@@ -20,6 +23,47 @@ class BuyFees:
         clearing = self.clearing_per_share * shares
         return comm + plat + clearing + self.other_fixed_fee_usd
 
+    def fee_array(self, shares: np.ndarray) -> np.ndarray:
+        """fee() 的向量化版本；shares<=0 的位置为 0。"""
+        shares = np.asarray(shares, dtype=np.float64)
+        comm = np.maximum(self.commission_min_usd, self.commission_per_share * shares)
+        plat = np.maximum(self.platform_min_usd, self.platform_per_share * shares)
+        clearing = self.clearing_per_share * shares
+        return np.where(shares > 0, comm + plat + clearing + self.other_fixed_fee_usd, 0.0)
+
+    def max_affordable_shares(self, usd_budget, price):
+        """满足 shares*price + fee(shares) <= usd_budget 的最大连续股数（<=0 表示一股都买不起）。
+
+        max(a,b) + max(c,d) 等于四种组合里最大的一条直线，所以“总成本 <= 预算”
+        等价于四条直线都 <= 预算：分别解出来取最小值即可，O(1)。标量和 ndarray 都可以传。
+        """
+        base = usd_budget - self.other_fixed_fee_usd
+        slope = price + self.clearing_per_share
+        cps, pps = self.commission_per_share, self.platform_per_share
+        cm, pm = self.commission_min_usd, self.platform_min_usd
+        return np.minimum(
+            np.minimum((base - cm - pm) / slope, (base - cm) / (slope + pps)),
+            np.minimum((base - pm) / (slope + cps), base / (slope + cps + pps)),
+        )
+
+
+def buy_fees_for(cfg) -> BuyFees:
+    """由配置（fees_buy + execution.other_fixed_fee_usd）得到 BuyFees；同一份配置只构造一次。"""
+    return _buy_fees_cached(cfg.fees_buy, float(cfg.execution.other_fixed_fee_usd))
+
+
+@lru_cache(maxsize=8)
+def _buy_fees_cached(fees_buy, other_fixed_fee_usd: float) -> BuyFees:
+    # FeesBuy 是 frozen dataclass，可以直接当缓存键；BuyFees 也是 frozen 的，共享安全
+    return BuyFees(
+        commission_per_share=fees_buy.commission_per_share,
+        commission_min_usd=fees_buy.commission_min_usd,
+        platform_per_share=fees_buy.platform_per_share,
+        platform_min_usd=fees_buy.platform_min_usd,
+        clearing_per_share=fees_buy.clearing_per_share,
+        other_fixed_fee_usd=other_fixed_fee_usd,
+    )
+
 
 @dataclass(frozen=True)
 class SellExtraFees:
@@ -37,3 +81,10 @@ class SellExtraFees:
         activity = min(self.activity_max_usd, max(self.activity_min_usd, activity))
         cat = self.cat_per_share * shares
         return activity + cat + self.sec_fee_usd
+
+    def fee_array(self, shares: np.ndarray) -> np.ndarray:
+        """fee() 的向量化版本；shares<=0 的位置为 0。"""
+        shares = np.asarray(shares, dtype=np.float64)
+        activity = np.clip(self.activity_per_share * shares, self.activity_min_usd, self.activity_max_usd)
+        cat = self.cat_per_share * shares
+        return np.where(shares > 0, activity + cat + self.sec_fee_usd, 0.0)
@@ -4,24 +4,41 @@ import os
 import smtplib
 from email.mime.text import MIMEText
 from email.header import Header
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 
 
-def send_email(
+def _build_message(user: str, to_addr: str, subject: str, body: str) -> MIMEText:
+    msg = MIMEText(body, "plain", "utf-8")
+    msg["From"] = user
+    msg["To"] = to_addr
+    msg["Subject"] = Header(subject, "utf-8")
+    return msg
+
+
+def send_emails(
     smtp_host: str,
     smtp_port: int,
     user: str,
     password: str,
     to_addr: str,
-    subject: str,
-    body: str,
+    messages: Iterable[Tuple[str, str]],
 ) -> None:
-    msg = MIMEText(body, "plain", "utf-8")
-    msg["From"] = user
-    msg["To"] = to_addr
-    msg["Subject"] = Header(subject, "utf-8")
-
+    """一次 SSL 连接 + 登录，依次发送多封 (subject, body)。"""
     # QQ 邮箱推荐 465 SSL
     with smtplib.SMTP_SSL(smtp_host, smtp_port) as server:
         server.login(user, password)
-        server.sendmail(user, [to_addr], msg.as_string())
+        for subject, body in messages:
+            msg = _build_message(user, to_addr, subject, body)
+            server.sendmail(user, [to_addr], msg.as_string())
+
+
+def send_email(
+    smtp_host: str,
+    smtp_port: int,
+    user: str,
+    password: str,
+    to_addr: str,
+    subject: str,
+    body: str,
+) -> None:
+    send_emails(smtp_host, smtp_port, user, password, to_addr, [(subject, body)])
@@ -1,17 +1,22 @@
 from __future__ import annotations
 
+import atexit
 import datetime as dt
 import json
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import asdict
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
 
 from .calendar_utils import TradingCalendar
 from .config import Config, env_or_none
-from .data_sources import fetch_prices, fetch_signal_inputs, fetch_fx_usdcny
+from .data_sources import cached_prices, fetch_prices, fetch_signal_inputs, prefetch, resolve_fx_usdcny
 from .state import (
+    TradeLogRow,
     append_trade_log,
     get_cash_pool_start_cny,
+    get_logged_fx_usdcny,
     load_holdings,
     load_trade_log,
 )
@@ -19,12 +24,60 @@ from .strategy import allocate_orders, evaluate_signal
 from .brokers import PaperBroker, AlpacaBroker
 from .notify import send_email
 
+# 时区对象只解析一次
+_NY_TZ = ZoneInfo("America/New_York")
+_BJ_TZ = ZoneInfo("Asia/Shanghai")
 
-def _fmt_money(x: float, nd: int = 2) -> str:
-    try:
-        return f"{float(x):,.{nd}f}"
-    except Exception:
-        return str(x)
+
+def _write_json(path: Path, obj: object) -> None:
+    """orders/summary 落盘：2 空格缩进、中文不转义。
+
+    只用标准库 json：输出（包括 NaN 的写法）不随是否装了某个可选包而变。
+    """
+    path.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+_EMAIL_POOL: Optional[ThreadPoolExecutor] = None
+_EMAIL_FUTURES: List[Future] = []
+
+
+def _send_report(cfg: Config, asof_date: dt.date, signal: str, body: str, *, wait: bool = True) -> None:
+    """发送日报邮件。wait=True 时当场发完（失败直接抛出）；否则放到后台线程发送，不挡住 run_daily 返回。
+
+    后台发送的邮件在进程退出前会等它发完；发送失败由 wait_for_emails() 抛出。
+    """
+    global _EMAIL_POOL
+    if not cfg.email.enabled:
+        return
+    user = env_or_none(cfg.email.smtp_user_env)
+    pwd = env_or_none(cfg.email.smtp_pass_env)
+    to = env_or_none(cfg.email.to_env)
+    if not (user and pwd and to):
+        return
+    kwargs = dict(
+        smtp_host=cfg.email.smtp_host,
+        smtp_port=cfg.email.smtp_port,
+        user=user,
+        password=pwd,
+        to_addr=to,
+        subject=f"ETF 自动交易日报 {asof_date.isoformat()} {signal}",
+        body=body,
+    )
+    if wait:
+        send_email(**kwargs)
+        return
+    if _EMAIL_POOL is None:
+        _EMAIL_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="email")
+        atexit.register(_EMAIL_POOL.shutdown, wait=True)
+    _EMAIL_FUTURES.append(_EMAIL_POOL.submit(send_email, **kwargs))
+
+
+def wait_for_emails() -> None:
+    """等待 run_daily(wait_email=False) 放到后台的邮件发送完成；有发送失败时在这里抛出原异常（脚本入口据此返回非 0）。"""
+    pending = list(_EMAIL_FUTURES)
+    _EMAIL_FUTURES.clear()
+    for fut in pending:
+        fut.result()
 
 
 def _pct(x: float | None, nd: int = 2) -> str:
@@ -51,131 +104,118 @@ def _build_email_body(
     message: str | None = None,
 ) -> str:
     """给小白看的邮件正文：一句结论 + 关键数据 + 下单清单。"""
-    from zoneinfo import ZoneInfo
-
-    generated_bj = dt.datetime.now(tz=ZoneInfo("Asia/Shanghai")).strftime("%Y-%m-%d %H:%M:%S")
-    has_trade = bool(orders) and any(getattr(o, "side", "") == "BUY" and getattr(o, "shares", 0) > 0 for o in orders)
-
+    generated_bj = dt.datetime.now(tz=_BJ_TZ).strftime("%Y-%m-%d %H:%M:%S")
+    # 一次遍历同时得到：是否交易、买入合计、下单明细
     buy_usd = 0.0
     fee_usd = float(total_fee_usd or 0.0)
     order_lines: list[str] = []
-    if has_trade:
-        for o in orders:
-            if o.side != "BUY" or o.shares <= 0:
-                continue
-            amt = float(o.shares) * float(o.price)
-            buy_usd += amt
-            order_lines.append(
-                f"- {o.ticker}: 买入 {o.shares} 股；收盘价 {o.price:.2f} USD；预计金额 {_fmt_money(amt,2)} USD；手续费≈{_fmt_money(o.est_fee_usd,2)} USD"
-            )
-    else:
+    for o in orders or ():
+        if getattr(o, "side", "") != "BUY" or getattr(o, "shares", 0) <= 0:
+            continue
+        amt = float(o.shares) * float(o.price)
+        buy_usd += amt
+        order_lines.append(
+            f"- {o.ticker}: 买入 {o.shares} 股；收盘价 {o.price:.2f} USD；预计金额 {amt:,.2f} USD；手续费≈{float(o.est_fee_usd):,.2f} USD"
+        )
+    has_trade = bool(order_lines)
+    if not has_trade:
         order_lines.append("- 今日无下单")
 
+    # sig/md 的字段先统一读成本地变量，下面一次性格式化
+    signal = getattr(sig, "signal", "")
     buy_cny = float(getattr(sig, "recommended_buy_cny", 0.0) or 0.0)
     buy_usd_est = buy_cny / fx_rate if fx_rate else 0.0
+    reserve_add = float(getattr(sig, "reserve_add_cny", 0.0) or 0.0)
+    reserve_use = float(getattr(sig, "reserve_use_cny", 0.0) or 0.0)
+    drawdown = _pct(getattr(sig, "monthly_drawdown", None), 2)
+    days_since = int(getattr(sig, "days_since_last_trade", 0))
+    close = float(getattr(md, "close", 0.0) or 0.0)
+    prev_close = float(getattr(md, "prev_close", 0.0) or 0.0)
+    ma200 = float(getattr(md, "ma200", 0.0) or 0.0)
+    month_high = float(getattr(md, "month_high_close", 0.0) or 0.0)
+    # prices 按 cfg.symbols.portfolio 的顺序构造，直接遍历它，组合换标的时这里不用跟着改
+    price_line = ", ".join(f"{t}={float(p):,.2f}" for t, p in prices.items())
 
     # RSP 关键数据
     below = "是" if bool(getattr(sig, "below_MA200", False)) else "否"
     third_friday = "是" if bool(getattr(sig, "third_friday", False)) else "否"
     cooldown_ok = "是" if bool(getattr(sig, "cooldown_ok", False)) else "否"
-
-    lines = []
-    lines.append("ETF 自动交易日报（北京时间）")
-    lines.append(f"生成时间：{generated_bj}")
-    lines.append(f"对应美股收盘交易日：{asof_date.isoformat()}")
-    lines.append("")
-
-    # 1) 结论
-    lines.append("1) 今日结论")
-    lines.append(f"- 信号：{getattr(sig, 'signal', '')}")
-    lines.append(f"- 是否交易：{'交易' if has_trade else '不交易'}")
-    if message:
-        lines.append(f"- 说明：{message}")
-    lines.append(f"- 推荐买入总额：{_fmt_money(buy_cny,2)} CNY（按 FX 约 {_fmt_money(buy_usd_est,2)} USD）")
-    lines.append(f"- USD/CNY（当次使用）：{fx_rate:.6f}")
-    lines.append("")
-
-    # 2) 关键数据（RSP）
-    lines.append("2) 关键数据（用于触发规则）")
-    lines.append(f"- RSP 收盘：{_fmt_money(getattr(md, 'close', 0.0),2)}；前收：{_fmt_money(getattr(md, 'prev_close', 0.0),2)}")
-    lines.append(f"- MA200：{_fmt_money(getattr(md, 'ma200', 0.0),2)}；收盘在 MA200 下方：{below}")
-    lines.append(f"- 月内最高收盘：{_fmt_money(getattr(md, 'month_high_close', 0.0),2)}；月内回撤：{_pct(getattr(sig, 'monthly_drawdown', None),2)}")
-    lines.append(f"- 第三个周五兜底：{third_friday}")
-    lines.append(f"- 距离上次交易：{int(getattr(sig, 'days_since_last_trade', 0))} 个交易日；冷却期满足：{cooldown_ok}")
-    lines.append("")
-
-    # 3) 现金池
-    lines.append("3) 现金池（待命现金）")
-    lines.append(f"- 起始：{_fmt_money(cash_pool_start_cny,2)} CNY")
-    lines.append(f"- 本次增加：{_fmt_money(float(getattr(sig, 'reserve_add_cny', 0.0) or 0.0),2)} CNY")
-    lines.append(f"- 本次使用：{_fmt_money(float(getattr(sig, 'reserve_use_cny', 0.0) or 0.0),2)} CNY")
-    lines.append(f"- 结束：{_fmt_money(cash_pool_end_cny,2)} CNY")
-    lines.append("")
-
-    # 4) 下单清单
-    lines.append("4) 今日下单清单（照单下单即可）")
-    lines.extend(order_lines)
-    lines.append("")
-    lines.append("合计（估算）：")
-    lines.append(f"- 买入金额：{_fmt_money(buy_usd,2)} USD")
-    lines.append(f"- 手续费：{_fmt_money(fee_usd,2)} USD")
-    lines.append(f"- 预计占用现金：{_fmt_money(buy_usd + fee_usd,2)} USD")
-    lines.append("")
-
-    # 5) 价格回顾
-    lines.append("5) 组合 ETF 收盘价（用于下单计算）")
-    lines.append(
-        "- "
-        + ", ".join(
-            [
-                f"IWY={_fmt_money(prices.get('IWY', 0.0),2)}",
-                f"SPMO={_fmt_money(prices.get('SPMO', 0.0),2)}",
-                f"RSP={_fmt_money(prices.get('RSP', 0.0),2)}",
-                f"PFF={_fmt_money(prices.get('PFF', 0.0),2)}",
-                f"VNQ={_fmt_money(prices.get('VNQ', 0.0),2)}",
-            ]
-        )
+    message_line = f"- 说明：{message}\n" if message else ""
+    orders_block = "\n".join(order_lines)
+
+    return (
+        "ETF 自动交易日报（北京时间）\n"
+        f"生成时间：{generated_bj}\n"
+        f"对应美股收盘交易日：{asof_date.isoformat()}\n"
+        "\n"
+        # 1) 结论
+        "1) 今日结论\n"
+        f"- 信号：{signal}\n"
+        f"- 是否交易：{'交易' if has_trade else '不交易'}\n"
+        f"{message_line}"
+        f"- 推荐买入总额：{buy_cny:,.2f} CNY（按 FX 约 {buy_usd_est:,.2f} USD）\n"
+        f"- USD/CNY（当次使用）：{fx_rate:.6f}\n"
+        "\n"
+        # 2) 关键数据（RSP）
+        "2) 关键数据（用于触发规则）\n"
+        f"- RSP 收盘：{close:,.2f}；前收：{prev_close:,.2f}\n"
+        f"- MA200：{ma200:,.2f}；收盘在 MA200 下方：{below}\n"
+        f"- 月内最高收盘：{month_high:,.2f}；月内回撤：{drawdown}\n"
+        f"- 第三个周五兜底：{third_friday}\n"
+        f"- 距离上次交易：{days_since} 个交易日；冷却期满足：{cooldown_ok}\n"
+        "\n"
+        # 3) 现金池
+        "3) 现金池（待命现金）\n"
+        f"- 起始：{cash_pool_start_cny:,.2f} CNY\n"
+        f"- 本次增加：{reserve_add:,.2f} CNY\n"
+        f"- 本次使用：{reserve_use:,.2f} CNY\n"
+        f"- 结束：{cash_pool_end_cny:,.2f} CNY\n"
+        "\n"
+        # 4) 下单清单
+        "4) 今日下单清单（照单下单即可）\n"
+        f"{orders_block}\n"
+        "\n"
+        "合计（估算）：\n"
+        f"- 买入金额：{buy_usd:,.2f} USD\n"
+        f"- 手续费：{fee_usd:,.2f} USD\n"
+        f"- 预计占用现金：{buy_usd + fee_usd:,.2f} USD\n"
+        "\n"
+        # 5) 价格回顾
+        "5) 组合 ETF 收盘价（用于下单计算）\n"
+        f"- {price_line}\n"
+        "\n"
+        # 6) 执行状态
+        "6) 执行状态\n"
+        f"- {broker_result}"
     )
-    lines.append("")
 
-    # 6) 执行状态
-    lines.append("6) 执行状态")
-    lines.append(f"- {broker_result}")
 
-    return "\n".join(lines)
 
+def run_daily(cfg: Config, asof_date: dt.date | None = None, *, wait_email: bool = True) -> Dict[str, object]:
+    """执行每日流程：拉取数据 -> 评估信号 -> 生成订单 -> 记录日志 -> 邮件通知。
 
+    默认等邮件发完再返回，SMTP 失败直接从这里抛出。wait_email=False 时邮件在后台线程发送、
+    run_daily 立即返回：调用方之后要调用 wait_for_emails()，发送失败才会抛出（scripts/run_daily.py 就是这样用的）。
+    """
+    cal = TradingCalendar()
 
-def run_daily(cfg: Config, asof_date: dt.date | None = None) -> Dict[str, object]:
-    """执行每日流程：拉取数据 -> 评估信号 -> 生成订单 -> 记录日志 -> 邮件通知。"""
     if asof_date is None:
         # 以美东时间判断当天是否已收盘；收盘前运行则默认使用上一个交易日收盘数据
-        from zoneinfo import ZoneInfo
-
-        market_now = dt.datetime.now(tz=ZoneInfo("America/New_York"))
+        market_now = dt.datetime.now(tz=_NY_TZ)
         tentative = market_now.date()
-        cal_tmp = TradingCalendar()
-
-        def last_trading_day(d: dt.date) -> dt.date:
-            x = d
-            while not cal_tmp.is_trading_day(x):
-                x -= dt.timedelta(days=1)
-            return x
 
         # 收盘后再用当天，否则用上一交易日
         if (market_now.hour, market_now.minute) < (16, 10):
             # 还没收盘：若今天是交易日，用上一交易日；否则取最近交易日
-            if cal_tmp.is_trading_day(tentative):
-                asof_date = last_trading_day(tentative - dt.timedelta(days=1))
+            if cal.is_trading_day(tentative):
+                asof_date = cal.last_trading_day(tentative - dt.timedelta(days=1))
             else:
-                asof_date = last_trading_day(tentative)
+                asof_date = cal.last_trading_day(tentative)
         else:
             # 已收盘：若今天不是交易日，回退到最近交易日
-            asof_date = last_trading_day(tentative)
+            asof_date = cal.last_trading_day(tentative)
 
-    cal = TradingCalendar()
-
-    # 信号数据
+    # 信号数据（只有它决定今天是否交易，先单独拉）
     md = fetch_signal_inputs(cfg.symbols.signal, asof_date)
 
     trade_log = load_trade_log()
@@ -197,19 +237,21 @@ def run_daily(cfg: Config, asof_date: dt.date | None = None) -> Dict[str, object
         manual_cny=cfg.cash_pool.manual_cny,
     )
 
-    # 持仓与价格（即使不交易也拉取，便于邮件里展示）
     holdings = load_holdings()
-    prices = fetch_prices(cfg.symbols.portfolio, asof_date)
-    fx_rate = cfg.params.fx_usd_cny
-    if str(getattr(cfg.params, "fx_mode", "fixed")).lower() == "auto":
-        fx_rate = fetch_fx_usdcny(
-            asof_date,
-            symbol=getattr(cfg.params, "fx_symbol", "USDCNY=X"),
-            fallback=getattr(cfg.params, "fx_fallback_usd_cny", fx_rate),
-        )
+
+    # auto 汇率：同一交易日重跑时，直接用日志里当天记下的汇率，不再联网
+    logged_fx = get_logged_fx_usdcny(trade_log, asof_date) if str(cfg.params.fx_mode).lower() == "auto" else None
 
     # 推荐买入=0：不生成订单，也不写入交易日志；依然会发一封“无交易”的日报
     if sig.recommended_buy_cny <= 0:
+        # 价格/汇率只用于邮件和落盘展示：优先用本地缓存里 asof 当天的收盘，缓存没有或太旧的才联网
+        prices = cached_prices(cfg.symbols.portfolio, asof_date)
+        missing = [t for t in cfg.symbols.portfolio if t not in prices]
+        if missing:
+            prices.update(fetch_prices(missing, asof_date))
+        prices = {t: prices[t] for t in cfg.symbols.portfolio}
+        fx_rate = logged_fx if logged_fx is not None else resolve_fx_usdcny(cfg, asof_date, prefer_cache=True)
+
         broker_result = "BROKER: SKIPPED（无交易）"
         orders = []
         total_fee_usd = 0.0
@@ -231,22 +273,18 @@ def run_daily(cfg: Config, asof_date: dt.date | None = None) -> Dict[str, object
 
         # 仍然落盘一份 orders/summary，方便你回看
         Path("data").mkdir(parents=True, exist_ok=True)
-        Path(f"data/orders_{asof_date.isoformat()}.json").write_text(
-            json.dumps(
-                {
-                    "date": asof_date.isoformat(),
-                    "fx_usd_cny": float(fx_rate),
-                    "prices_close": prices,
-                    "signal": sig.signal,
-                    "recommended_buy_cny": float(sig.recommended_buy_cny),
-                    "orders": [],
-                    "total_fee_usd": 0.0,
-                    "message": "no_trade",
-                },
-                ensure_ascii=False,
-                indent=2,
-            ),
-            encoding="utf-8",
+        _write_json(
+            Path(f"data/orders_{asof_date.isoformat()}.json"),
+            {
+                "date": asof_date.isoformat(),
+                "fx_usd_cny": float(fx_rate),
+                "prices_close": prices,
+                "signal": sig.signal,
+                "recommended_buy_cny": float(sig.recommended_buy_cny),
+                "orders": [],
+                "total_fee_usd": 0.0,
+                "message": "no_trade",
+            },
         )
 
         summary = {
@@ -266,29 +304,21 @@ def run_daily(cfg: Config, asof_date: dt.date | None = None) -> Dict[str, object
             "total_fee_usd": 0.0,
             "broker_result": broker_result,
         }
-        Path(f"data/summary_{asof_date.isoformat()}.json").write_text(
-            json.dumps(summary, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        _write_json(Path(f"data/summary_{asof_date.isoformat()}.json"), summary)
 
-        if cfg.email.enabled:
-            user = env_or_none(cfg.email.smtp_user_env)
-            pwd = env_or_none(cfg.email.smtp_pass_env)
-            to = env_or_none(cfg.email.to_env)
-            if user and pwd and to:
-                send_email(
-                    smtp_host=cfg.email.smtp_host,
-                    smtp_port=cfg.email.smtp_port,
-                    user=user,
-                    password=pwd,
-                    to_addr=to,
-                    subject=f"ETF 自动交易日报 {asof_date.isoformat()} {sig.signal}",
-                    body=body,
-                )
+        _send_report(cfg, asof_date, sig.signal, body, wait=wait_email)
 
         return summary
 
-    # 有交易：生成订单并执行
+    # 有交易：组合标的（auto 汇率时再加上汇率标的）合并成一次并发批量下载，后面的 fetch_* 直接用内存结果
+    run_symbols = list(cfg.symbols.portfolio)
+    if str(cfg.params.fx_mode).lower() == "auto" and logged_fx is None:
+        run_symbols.append(cfg.params.fx_symbol)
+    prefetch(run_symbols, asof_date)
+    prices = fetch_prices(cfg.symbols.portfolio, asof_date)
+    fx_rate = logged_fx if logged_fx is not None else resolve_fx_usdcny(cfg, asof_date)
+
+    # 生成订单并执行
     orders, total_fee_usd, cash_pool_end_cny = allocate_orders(
         cfg,
         fx_usd_cny=float(fx_rate),
@@ -311,30 +341,26 @@ def run_daily(cfg: Config, asof_date: dt.date | None = None) -> Dict[str, object
     broker_result = broker.place_orders(asof_date, orders)
 
     # 写 trade log
-    row = {
-        "date": asof_date.isoformat(),
-        "month_key": sig.month_key.isoformat(),
-        "signal": sig.signal,
-        "base_buy_cny": round(sig.base_buy_cny, 4),
-        "below_ma200": bool(sig.below_ma200) if sig.below_ma200 is not None else "",
-        "reserve_add_cny": round(sig.reserve_add_cny, 4),
-        "reserve_use_cny": round(sig.reserve_use_cny, 4),
-        "recommended_buy_cny": round(sig.recommended_buy_cny, 4),
-        "total_fee_usd": round(total_fee_usd, 6),
-        "fx_usd_cny": round(float(fx_rate), 6),
-        "price_IWY": round(float(prices.get("IWY", 0.0)), 6),
-        "price_SPMO": round(float(prices.get("SPMO", 0.0)), 6),
-        "price_RSP": round(float(prices.get("RSP", 0.0)), 6),
-        "price_PFF": round(float(prices.get("PFF", 0.0)), 6),
-        "price_VNQ": round(float(prices.get("VNQ", 0.0)), 6),
-        "cash_pool_end_cny": round(cash_pool_end_cny, 4),
-        "rsp_close": round(md.close, 6),
-        "month_high_close": round(md.month_high_close, 6),
-        "monthly_drawdown": round(sig.monthly_drawdown, 8) if sig.monthly_drawdown is not None else "",
-        "third_friday": bool(sig.third_friday),
-        "days_since_last_trade": int(sig.days_since_last_trade),
-        "cooldown_ok": bool(sig.cooldown_ok),
-    }
+    row = TradeLogRow(
+        date=asof_date.isoformat(),
+        month_key=sig.month_key.isoformat(),
+        signal=sig.signal,
+        base_buy_cny=round(sig.base_buy_cny, 4),
+        below_ma200=bool(sig.below_ma200) if sig.below_ma200 is not None else "",
+        reserve_add_cny=round(sig.reserve_add_cny, 4),
+        reserve_use_cny=round(sig.reserve_use_cny, 4),
+        recommended_buy_cny=round(sig.recommended_buy_cny, 4),
+        total_fee_usd=round(total_fee_usd, 6),
+        fx_usd_cny=round(float(fx_rate), 6),
+        prices={t: round(float(prices.get(t, 0.0)), 6) for t in cfg.symbols.portfolio},
+        cash_pool_end_cny=round(cash_pool_end_cny, 4),
+        rsp_close=round(md.close, 6),
+        month_high_close=round(md.month_high_close, 6),
+        monthly_drawdown=round(sig.monthly_drawdown, 8) if sig.monthly_drawdown is not None else "",
+        third_friday=bool(sig.third_friday),
+        days_since_last_trade=int(sig.days_since_last_trade),
+        cooldown_ok=bool(sig.cooldown_ok),
+    )
     append_trade_log(row)
 
     body = _build_email_body(
@@ -350,21 +376,6 @@ def run_daily(cfg: Config, asof_date: dt.date | None = None) -> Dict[str, object
         broker_result=str(broker_result),
     )
 
-    if cfg.email.enabled:
-        user = env_or_none(cfg.email.smtp_user_env)
-        pwd = env_or_none(cfg.email.smtp_pass_env)
-        to = env_or_none(cfg.email.to_env)
-        if user and pwd and to:
-            send_email(
-                smtp_host=cfg.email.smtp_host,
-                smtp_port=cfg.email.smtp_port,
-                user=user,
-                password=pwd,
-                to_addr=to,
-                subject=f"ETF 自动交易日报 {asof_date.isoformat()} {sig.signal}",
-                body=body,
-            )
-
     summary = {
         "date": asof_date.isoformat(),
         "signal": sig.signal,
@@ -395,13 +406,10 @@ def run_daily(cfg: Config, asof_date: dt.date | None = None) -> Dict[str, object
         "total_fee_usd": float(total_fee_usd),
     }
     Path("data").mkdir(parents=True, exist_ok=True)
-    Path(f"data/orders_{asof_date.isoformat()}.json").write_text(
-        json.dumps(orders_out, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
-    Path(f"data/summary_{asof_date.isoformat()}.json").write_text(
-        json.dumps(summary, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+    _write_json(Path(f"data/orders_{asof_date.isoformat()}.json"), orders_out)
+    _write_json(Path(f"data/summary_{asof_date.isoformat()}.json"), summary)
+
+    # 文件都落盘之后再发邮件
+    _send_report(cfg, asof_date, sig.signal, body, wait=wait_email)
 
     return summary
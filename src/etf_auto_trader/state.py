@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import csv
 import datetime as dt
-from dataclasses import dataclass
+import io
+import os
+from dataclasses import dataclass, fields
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 
@@ -11,59 +15,183 @@ import pandas as pd
 TRADE_LOG_PATH = Path("data/trade_log.csv")
 HOLDINGS_PATH = Path("data/holdings.csv")
 
+_DATE_COLUMNS = ("date", "month_key")
+_RESERVE_COLUMNS = ("reserve_add_cny", "reserve_use_cny")
+
 
 def ensure_data_dir() -> None:
     Path("data").mkdir(parents=True, exist_ok=True)
 
 
-def load_holdings() -> pd.DataFrame:
+def _to_shares(v: Optional[str]) -> float:
+    # 与原先 pd.to_numeric(errors="coerce").fillna(0) 一致：空值/非数字当 0
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if x != x else x
+
+
+def load_holdings() -> Dict[str, float]:
+    """读取持仓：{ticker: shares}，按文件顺序；同一 ticker 出现多次时股数相加。"""
     if not HOLDINGS_PATH.exists():
         raise FileNotFoundError(f"缺少 {HOLDINGS_PATH}. 请先填写 data/holdings.csv")
-    df = pd.read_csv(HOLDINGS_PATH)
-    df.columns = [c.strip().lower() for c in df.columns]
-    if "ticker" not in df.columns or "shares" not in df.columns:
-        raise ValueError("holdings.csv 需要列：ticker,shares")
-    df["ticker"] = df["ticker"].astype(str).str.upper()
-    df["shares"] = pd.to_numeric(df["shares"], errors="coerce").fillna(0.0)
-    return df[["ticker", "shares"]]
+    # 几行的小文件：用标准库 csv 读，避免 read_csv 的固定开销
+    with HOLDINGS_PATH.open(newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [c.strip().lower() for c in next(reader, [])]
+        if "ticker" not in header or "shares" not in header:
+            raise ValueError("holdings.csv 需要列：ticker,shares")
+        ti, si = header.index("ticker"), header.index("shares")
+        holdings: Dict[str, float] = {}
+        for r in reader:
+            if not r:
+                continue
+            t = r[ti].upper() if ti < len(r) else ""
+            holdings[t] = holdings.get(t, 0.0) + _to_shares(r[si] if si < len(r) else None)
+    return holdings
+
+
+_TRADE_LOG_COLUMNS = (
+    "date",
+    "month_key",
+    "signal",
+    "base_buy_cny",
+    "below_ma200",
+    "reserve_add_cny",
+    "reserve_use_cny",
+    "recommended_buy_cny",
+    "total_fee_usd",
+    "cash_pool_end_cny",
+    "rsp_close",
+    "month_high_close",
+    "monthly_drawdown",
+    "third_friday",
+    "days_since_last_trade",
+    "cooldown_ok",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class TradeLogRow:
+    """run_daily 写入 trade_log.csv 的一行；字段顺序即新日志里模板列之后的列顺序。
+
+    prices 是 {ticker: 收盘价}，写入时在原位置展开成 price_<ticker> 列；
+    组合换了标的只会带来新列（由 append_trade_log 整表重写对齐），不用改这里。
+    """
+    date: str
+    month_key: str
+    signal: str
+    base_buy_cny: float
+    below_ma200: object  # bool，未知时为 ""
+    reserve_add_cny: float
+    reserve_use_cny: float
+    recommended_buy_cny: float
+    total_fee_usd: float
+    fx_usd_cny: float
+    prices: Dict[str, float]
+    cash_pool_end_cny: float
+    rsp_close: float
+    month_high_close: float
+    monthly_drawdown: object  # float，未知时为 ""
+    third_friday: bool
+    days_since_last_trade: int
+    cooldown_ok: bool
+
+    def as_dict(self) -> Dict[str, object]:
+        out: Dict[str, object] = {}
+        for f in _TRADE_LOG_ROW_FIELDS:
+            if f == "prices":
+                for t, p in self.prices.items():
+                    out[f"price_{t}"] = p
+            else:
+                out[f] = getattr(self, f)
+        return out
+
+
+_TRADE_LOG_ROW_FIELDS = tuple(f.name for f in fields(TradeLogRow))
 
 
 def load_trade_log() -> pd.DataFrame:
-    if not TRADE_LOG_PATH.exists():
-        return pd.DataFrame(
-            columns=[
-                "date",
-                "month_key",
-                "signal",
-                "base_buy_cny",
-                "below_ma200",
-                "reserve_add_cny",
-                "reserve_use_cny",
-                "recommended_buy_cny",
-                "total_fee_usd",
-                "cash_pool_end_cny",
-                "rsp_close",
-                "month_high_close",
-                "monthly_drawdown",
-                "third_friday",
-                "days_since_last_trade",
-                "cooldown_ok",
-            ]
-        )
-    df = pd.read_csv(TRADE_LOG_PATH)
-    # Normalize
-    if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-    if "month_key" in df.columns:
-        df["month_key"] = pd.to_datetime(df["month_key"]).dt.date
+    try:
+        st = TRADE_LOG_PATH.stat()
+    except FileNotFoundError:
+        return pd.DataFrame(columns=list(_TRADE_LOG_COLUMNS))
+    # 以 (路径, mtime, 大小) 为键：同一进程内文件没变就不再重复解析；返回浅拷贝，调用方改列不会污染缓存
+    return _load_trade_log_cached(str(TRADE_LOG_PATH.resolve()), st.st_mtime_ns, st.st_size).copy(deep=False)
+
+
+@lru_cache(maxsize=4)
+def _load_trade_log_cached(path: str, mtime_ns: int, size: int) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    # Normalize：保持 datetime64 列（向量化比较），不逐行转成 dt.date 对象
+    for c in _DATE_COLUMNS:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c])
     return df
 
 
-def append_trade_log(row: Dict[str, object]) -> None:
+def _csv_cell(v: object) -> object:
+    # 与 DataFrame.to_csv 的写法一致：None/NaN 写空，其余按 str()
+    if v is None or (isinstance(v, float) and v != v):
+        return ""
+    return v
+
+
+def _csv_line(values: List[object]) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator=os.linesep).writerow(values)
+    return buf.getvalue().encode("utf-8")
+
+
+def append_trade_log(row: TradeLogRow | Dict[str, object]) -> None:
+    """追加一行日志：表头兼容时只在文件末尾写一行（O(1)），出现新列时才整表重写。
+
+    常规路径只打开一次文件：读表头、检查末尾换行、一次 write，再 fsync（日志是状态来源，要落盘）。
+    """
     ensure_data_dir()
+    if isinstance(row, TradeLogRow):
+        row = row.as_dict()
+    with TRADE_LOG_PATH.open("a+b") as f:
+        f.seek(0)
+        first = f.readline()
+        if first:
+            header = next(csv.reader([first.decode("utf-8")]))
+            if any(c not in header for c in row):
+                header = None
+            else:
+                data = _csv_line([_csv_cell(row.get(c)) for c in header])
+                # 上一行没有换行结尾时先补上
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) not in (b"\n", b"\r"):
+                    data = os.linesep.encode() + data
+        else:
+            # 新日志（或空文件）：模板列在前，本行多出的列按出现顺序接在后面
+            header = list(_TRADE_LOG_COLUMNS) + [c for c in row if c not in _TRADE_LOG_COLUMNS]
+            data = _csv_line(header) + _csv_line([_csv_cell(row.get(c)) for c in header])
+        if header is not None:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            return
+    # 本行带来新列：退回整表重写
+    _rewrite_trade_log(row)
+
+
+def _rewrite_trade_log(row: Dict[str, object]) -> None:
+    """本行带来新列：读出整表、按列名对齐后重写。"""
     df = load_trade_log()
-    df2 = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-    df2.to_csv(TRADE_LOG_PATH, index=False)
+    new = pd.DataFrame([row])
+    for c in _DATE_COLUMNS:
+        if c in new.columns:
+            new[c] = pd.to_datetime(new[c])
+    if df.empty:
+        # 空日志只提供列顺序；直接 concat 空表会把日期列退化成 object
+        cols = list(df.columns) + [c for c in new.columns if c not in df.columns]
+        df2 = new.reindex(columns=cols)
+    else:
+        df2 = pd.concat([df, new], ignore_index=True)
+    df2.to_csv(TRADE_LOG_PATH, index=False, date_format="%Y-%m-%d")
 
 
 def get_cash_pool_start_cny(trade_log: pd.DataFrame, enabled: bool, source: str, manual_cny: float) -> float:
@@ -74,15 +202,36 @@ def get_cash_pool_start_cny(trade_log: pd.DataFrame, enabled: bool, source: str,
     # AUTO: last row cash_pool_end_cny
     if trade_log.empty or "cash_pool_end_cny" not in trade_log.columns:
         return 0.0
-    last = trade_log["cash_pool_end_cny"].dropna()
-    if last.empty:
+    # 日志已在内存里（run_daily 读过一次且有缓存）：直接取最后一个非空值，不再 dropna 出一份副本
+    col = trade_log["cash_pool_end_cny"]
+    idx = col.last_valid_index()
+    if idx is None:
         return 0.0
-    return float(last.iloc[-1])
+    return float(col.at[idx])
+
+
+def get_logged_fx_usdcny(trade_log: pd.DataFrame, asof_date: dt.date) -> Optional[float]:
+    """最后一行日志就是 asof_date 当天时，返回它记下的汇率（同日重跑直接复用）；否则 None。"""
+    if trade_log.empty or "fx_usd_cny" not in trade_log.columns or "date" not in trade_log.columns:
+        return None
+    if trade_log["date"].iloc[-1] != pd.Timestamp(asof_date):
+        return None
+    fx = pd.to_numeric(trade_log["fx_usd_cny"].iloc[-1:], errors="coerce").iloc[0]
+    return float(fx) if fx > 0 else None
 
 
 def get_reserve_balance_cny(trade_log: pd.DataFrame) -> float:
-    if trade_log.empty:
-        return 0.0
-    add = pd.to_numeric(trade_log.get("reserve_add_cny", 0.0), errors="coerce").fillna(0.0).sum()
-    use = pd.to_numeric(trade_log.get("reserve_use_cny", 0.0), errors="coerce").fillna(0.0).sum()
+    add, use = get_reserve_totals_cny(trade_log)
     return float(add - use)
+
+
+def get_reserve_totals_cny(trade_log: pd.DataFrame) -> Tuple[float, float]:
+    """日志里 reserve_add_cny / reserve_use_cny 各自的合计。"""
+    if trade_log.empty:
+        return 0.0, 0.0
+    # 两列一起取成一个 float64 数组（缺列按 0）；read_csv 读出的一般已是数值列，只有混入文本时才逐列转换
+    cols = trade_log.reindex(columns=list(_RESERVE_COLUMNS))
+    if not all(pd.api.types.is_numeric_dtype(t) for t in cols.dtypes):
+        cols = cols.apply(pd.to_numeric, errors="coerce")
+    arr = cols.to_numpy(dtype="float64", na_value=0.0)
+    return float(arr[:, 0].sum()), float(arr[:, 1].sum())
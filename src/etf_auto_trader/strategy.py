@@ -1,18 +1,20 @@
 from __future__ import annotations
 
 import datetime as dt
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+import math
+from dataclasses import dataclass, fields
+from typing import Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
 from .calendar_utils import TradingCalendar
 from .config import Config
-from .fees import BuyFees
-from .state import get_reserve_balance_cny
+from .fees import BuyFees, buy_fees_for
+from .state import get_reserve_balance_cny, get_reserve_totals_cny
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SignalResult:
     date: dt.date
     is_trading_day: bool
@@ -60,17 +62,23 @@ def evaluate_signal(cfg: Config, cal: TradingCalendar, asof: dt.date,
         below = rsp_close < ma200
 
     mk = _month_key(asof)
-    tlm = trade_log[trade_log.get("month_key", pd.Series([], dtype=object)) == mk] if not trade_log.empty else trade_log.iloc[0:0]
+    # 没有 month_key 列就当作本月无交易，不再为 .get 的默认值临时建一个空 Series
+    if trade_log.empty or "month_key" not in trade_log.columns:
+        tlm = trade_log.iloc[0:0]
+    else:
+        tlm = trade_log[trade_log["month_key"] == pd.Timestamp(mk)]
     trades_this_month = int(len(tlm))
 
-    has_first = bool((tlm.get("signal", pd.Series([], dtype=str)) == "First").any()) if trades_this_month else False
-    has_second = bool((tlm.get("signal", pd.Series([], dtype=str)) == "Second").any()) if trades_this_month else False
-    has_third = bool((tlm.get("signal", pd.Series([], dtype=str)) == "Third").any()) if trades_this_month else False
+    # 当月出现过的信号只收集一次，后面做集合查找
+    signals_present = set(tlm["signal"].tolist()) if trades_this_month and "signal" in tlm.columns else frozenset()
+    has_first = "First" in signals_present
+    has_second = "Second" in signals_present
+    has_third = "Third" in signals_present
 
-    # 最近一笔日期（仅当月）
+    # 最近一笔日期（仅当月）；Series.max 默认跳过 NaT，不用先 dropna 出副本
     last_trade_date = None
     if trades_this_month and "date" in tlm.columns:
-        last_trade_date = tlm["date"].dropna().max()
+        last_trade_date = tlm["date"].max()
         if pd.isna(last_trade_date):
             last_trade_date = None
 
@@ -187,7 +195,155 @@ def evaluate_signal(cfg: Config, cal: TradingCalendar, asof: dt.date,
     )
 
 
-@dataclass
+def evaluate_signals_batch(cfg: Config, cal: TradingCalendar, dates,
+                           closes, prev_closes, ma200s, month_highs,
+                           trade_log: pd.DataFrame) -> pd.DataFrame:
+    """
+    逐日连续评估多天（回测用），结果与每天依次调用 evaluate_signal 一致，每行一个 SignalResult。
+
+    按 run_daily 的规则：推荐买入 > 0 的日子视为成交并记入日志，影响之后几天的
+    当月笔数 / First-Second-Third / 冷却期 / 待命现金。逐元素的部分（涨跌幅、回撤、
+    MA200、交易日、第三个周五）先用 NumPy 一次算完，顺序循环里只剩状态更新。
+    """
+    days = pd.to_datetime(pd.Index(dates)).values.astype("datetime64[D]")
+    close = np.asarray(closes, dtype=np.float64)
+    prev = np.asarray(prev_closes, dtype=np.float64)
+    ma200 = np.asarray(ma200s, dtype=np.float64)
+    mh = np.asarray(month_highs, dtype=np.float64)
+
+    # 与 evaluate_signal 相同：分母为 0 时记为 None
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_ret = np.where(prev != 0, close / prev - 1, np.nan)
+        monthly_dd = np.where(mh != 0, close / mh - 1, np.nan)
+    has_ret = prev != 0
+    has_dd = mh != 0
+    has_ma = ma200 != 0
+    below = close < ma200
+    above_ma = close >= ma200
+    is_td = cal.trading_day_mask(days)
+    third_fri = is_td & cal.third_friday_mask(days)
+    months = days.astype("datetime64[M]").astype("datetime64[D]")
+
+    p = cfg.params
+    invest = p.invest_cny_per_trade
+    # 待命现金分别累计 add/use，余额 = 两者之差（与 get_reserve_balance_cny 同样的算法）
+    reserve_added, reserve_used = get_reserve_totals_cny(trade_log)
+
+    # 按 month_key 一次分组，换月时直接取当月切片，不再每月扫一遍整张日志
+    if trade_log.empty or "month_key" not in trade_log.columns:
+        log_by_month: Dict[pd.Timestamp, pd.DataFrame] = {}
+    else:
+        log_by_month = dict(iter(trade_log.groupby("month_key", sort=False)))
+    no_trades = trade_log.iloc[0:0]
+
+    month_key = None
+    trades = 0
+    signals_present: set = set()
+    last_trade: Optional[pd.Timestamp] = None
+
+    out: List[SignalResult] = []
+    for i, day in enumerate(days.tolist()):
+        mk = months[i].item()
+        if mk != month_key:
+            # 换月：从已有日志里取这个月的状态（之后只做增量更新）
+            month_key = mk
+            tlm = log_by_month.get(pd.Timestamp(mk), no_trades)
+            trades = int(len(tlm))
+            signals_present = set(tlm["signal"].tolist()) if trades and "signal" in tlm.columns else set()
+            last_trade = None
+            if trades and "date" in tlm.columns:
+                last_trade = tlm["date"].max()
+                if pd.isna(last_trade):
+                    last_trade = None
+
+        td = bool(is_td[i])
+        reserve_balance = float(reserve_added - reserve_used)
+        has_first = "First" in signals_present
+        has_second = "Second" in signals_present
+        has_third = "Third" in signals_present
+        if last_trade is None or not td:
+            days_since = 999
+        else:
+            try:
+                days_since = cal.trading_days_between(last_trade, day)
+            except Exception:
+                days_since = 999
+        cooldown_ok = bool(days_since >= p.cooldown_trading_days)
+        month_limit_ok = bool(trades < p.max_trades_per_month)
+        dr = float(daily_ret[i]) if has_ret[i] else None
+        dd = float(monthly_dd[i]) if has_dd[i] else None
+        bl = bool(below[i]) if has_ma[i] else None
+
+        first_trigger = td and trades == 0 and cooldown_ok and (
+            (dr is not None and dr <= p.first_daily_drop_threshold) or bool(third_fri[i])
+        )
+        second_trigger = (td and has_first and not has_second and cooldown_ok and month_limit_ok
+                          and dd is not None and dd <= p.second_drawdown_threshold)
+        third_trigger = (td and has_second and not has_third and cooldown_ok and month_limit_ok
+                         and dd is not None and dd <= p.third_drawdown_threshold)
+        use_reserve = (td and reserve_balance > 0 and cooldown_ok
+                       and (bool(above_ma[i]) or second_trigger or third_trigger))
+        reserve_only = td and use_reserve and not (first_trigger or second_trigger or third_trigger)
+
+        if not td:
+            signal = "NotTradingDay"
+        elif third_trigger:
+            signal = "Third"
+        elif second_trigger:
+            signal = "Second"
+        elif first_trigger:
+            signal = "First"
+        elif reserve_only:
+            signal = "ReserveOnly"
+        else:
+            signal = "None"
+
+        if signal == "First":
+            base = invest * p.first_buy_ratio_below_ma200 if bl is True else invest
+        elif signal in ("Second", "Third"):
+            base = invest
+        else:
+            base = 0.0
+        reserve_add = invest * (1 - p.first_buy_ratio_below_ma200) if signal == "First" and bl is True else 0.0
+        reserve_use = reserve_balance if use_reserve else 0.0
+        recommended = base + reserve_use if signal not in ("NotTradingDay", "None") else 0.0
+
+        out.append(SignalResult(
+            date=day,
+            is_trading_day=td,
+            third_friday=bool(third_fri[i]),
+            daily_return=dr,
+            monthly_drawdown=dd,
+            below_ma200=bl,
+            month_key=mk,
+            trades_this_month=trades,
+            has_first=has_first,
+            has_second=has_second,
+            has_third=has_third,
+            days_since_last_trade=int(days_since),
+            cooldown_ok=cooldown_ok,
+            month_limit_ok=month_limit_ok,
+            signal=signal,
+            base_buy_cny=float(base),
+            reserve_add_cny=float(reserve_add),
+            reserve_use_cny=float(reserve_use),
+            recommended_buy_cny=float(recommended),
+            reserve_balance_before=float(reserve_balance),
+        ))
+
+        if recommended > 0:
+            # 当天成交：记入（虚拟的）日志状态
+            trades += 1
+            signals_present.add(signal)
+            ts = pd.Timestamp(day)
+            last_trade = ts if last_trade is None or ts > last_trade else last_trade
+            reserve_added += reserve_add
+            reserve_used += reserve_use
+
+    return pd.DataFrame(out, columns=[f.name for f in fields(SignalResult)])
+
+
+@dataclass(slots=True)
 class OrderLine:
     ticker: str
     side: str  # BUY/SELL/HOLD
@@ -204,6 +360,30 @@ def _round_down(x: float, step: float) -> float:
     return (x // step) * step
 
 
+def _step_down_to(start: float, step: float, limit: float, ok: Callable[[float], bool]) -> float:
+    """从 start 起按 step 往下找第一个 ok 的值（<=0 时返回 0）。
+
+    limit 是解析解给出的上界：直接跳到它附近，再用真实费用校正浮点误差，
+    结果与逐 step 递减相同，但只需 O(1) 次 fee 计算。
+    """
+    if start <= 0:
+        return 0.0
+    if step <= 0:
+        x = min(start, limit)
+        return x if x > 0 and ok(x) else 0.0
+    # 上界为负（连最低费用都付不起）时按 0 处理，最多退到 0 为止
+    j = max(0, math.ceil((start - max(limit, 0.0)) / step))
+    while j > 0 and ok(start - (j - 1) * step):
+        j -= 1
+    while True:
+        x = start - j * step
+        if x <= 0:
+            return 0.0
+        if ok(x):
+            return x
+        j += 1
+
+
 def affordable_buy_shares(
     usd_budget: float,
     price: float,
@@ -218,37 +398,72 @@ def affordable_buy_shares(
     if usd_budget <= 0 or price <= 0:
         return 0.0, 0.0
 
+    def ok(x: float) -> bool:
+        return x * price + buy_fees.fee(x) <= usd_budget + 1e-10
+
+    limit = buy_fees.max_affordable_shares(usd_budget + 1e-10, price)
     if allow_fractional:
         raw = usd_budget / price
         shares = _round_down(raw, step)
         # 防止浮点误差
         shares = float(max(0.0, round(shares, 10)))
-        for _ in range(200000):
-            fee = buy_fees.fee(shares)
-            if shares * price + fee <= usd_budget + 1e-10:
-                return shares, fee
-            shares = float(max(0.0, shares - step))
-            if shares <= 0:
-                return 0.0, 0.0
-        # fallback
-        fee = buy_fees.fee(shares)
-        return shares, fee
+        shares = float(_step_down_to(shares, step, limit, ok))
     else:
-        shares = int(usd_budget // price)
-        for _ in range(100000):
-            fee = buy_fees.fee(float(shares))
-            if shares * price + fee <= usd_budget + 1e-10:
-                return float(shares), fee
-            shares -= 1
-            if shares <= 0:
-                return 0.0, 0.0
-        fee = buy_fees.fee(float(shares))
-        return float(shares), fee
+        shares = float(_step_down_to(int(usd_budget // price), 1, limit, ok))
+    if shares <= 0:
+        return 0.0, 0.0
+    return shares, buy_fees.fee(shares)
+
+
+def affordable_buy_shares_array(
+    usd_budget: np.ndarray,
+    price: np.ndarray,
+    allow_fractional: bool,
+    step: float,
+    buy_fees: BuyFees,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """affordable_buy_shares 的向量化版本：所有标的一起解，预算或价格 <= 0 的位置为 0。"""
+    budget = np.asarray(usd_budget, dtype=np.float64)
+    price = np.asarray(price, dtype=np.float64)
+    valid = (budget > 0) & (price > 0)
+    px = np.where(valid, price, 1.0)
+    limit = buy_fees.max_affordable_shares(budget + 1e-10, px)
+
+    def ok(x: np.ndarray) -> np.ndarray:
+        return x * px + buy_fees.fee_array(x) <= budget + 1e-10
+
+    if allow_fractional and step <= 0:
+        x = np.minimum(budget / px, limit)
+        shares = np.where(valid & (x > 0) & ok(x), x, 0.0)
+        return shares, buy_fees.fee_array(shares)
+
+    if allow_fractional:
+        unit = float(step)
+        start = np.maximum(0.0, np.round((budget / px // unit) * unit, 10))
+    else:
+        unit = 1.0
+        start = budget // px
+    # 同 _step_down_to：先按解析上界跳到附近，再按真实费用逐位置校正
+    start = np.where(valid, start, 0.0)
+    j = np.maximum(0.0, np.ceil((start - np.maximum(limit, 0.0)) / unit))
+    while True:
+        up = (j > 0) & ok(start - (j - 1) * unit)
+        if not up.any():
+            break
+        j = j - up
+    while True:
+        x = start - j * unit
+        down = (x > 0) & ~ok(x)
+        if not down.any():
+            break
+        j = j + down
+    shares = np.where(valid & (x > 0), x, 0.0)
+    return shares, buy_fees.fee_array(shares)
 
 
 def allocate_orders(
     cfg: Config,
-    holdings: pd.DataFrame,
+    holdings: Dict[str, float],
     prices: Dict[str, float],
     buy_total_cny: float,
     cash_pool_cny: float,
@@ -264,49 +479,46 @@ def allocate_orders(
     fx = float(fx_usd_cny) if fx_usd_cny is not None else cfg.params.fx_usd_cny
     total_cny = float(buy_total_cny + (cash_pool_cny if cfg.cash_pool.enabled else 0.0))
 
-    # 组合当前市值与权重
-    df = holdings.copy()
-    df["price"] = df["ticker"].map(prices).astype(float)
-    df["value_cny"] = df["shares"].astype(float) * df["price"] * fx
-    port_value = float(df["value_cny"].sum())
+    # 组合当前市值与权重：几只标的直接用 NumPy 数组算（SoA），不建 DataFrame
+    tickers = list(holdings)
+    shares_held = np.array([float(v) for v in holdings.values()], dtype=np.float64)
+    price_held = np.array([float(prices.get(t, np.nan)) for t in tickers], dtype=np.float64)
+    value_cny = shares_held * price_held * fx
+    port_value = float(np.nansum(value_cny))
     # 若没持仓，按等权处理（避免除零）
     if port_value <= 0:
-        df["weight"] = 0.0
+        weight = np.zeros(len(tickers))
     else:
-        df["weight"] = df["value_cny"] / port_value
+        weight = value_cny / port_value
 
     target = cfg.params.target_weight_each
     ceiling = cfg.params.weight_ceiling_guardrail
 
-    def under_score(w: float) -> float:
-        if w >= ceiling:
-            return 0.0
-        return max(0.0, target - w)
-
-    df["underscore"] = df["weight"].apply(under_score)
+    # 权重 >= 护栏时为 0，否则 max(0, target - w)；fmax 与 Python max(0.0, nan) 一样把 NaN 当 0
+    underscore = np.where(weight >= ceiling, 0.0, np.fmax(0.0, target - weight))
+    sum_us = float(underscore.sum())
+    # underscore 降序排名；按 pandas sort_values(ascending=False) 的做法（反转→quicksort→再反转），
+    # 同分标的的先后与原来逐位一致
+    rank = np.arange(len(tickers))[::-1][underscore[::-1].argsort(kind="quicksort")][::-1]
 
-    sum_us = float(df["underscore"].sum())
+    # top 2 underscore：只算一次，平均分的情况下二次分配也用它们
+    top1 = str(tickers[rank[0]])
+    top1s = float(underscore[rank[0]])
+    top2s = float(underscore[rank[1]]) if len(tickers) > 1 else 0.0
+    top2 = str(tickers[rank[1]]) if top2s > 0 else ""
 
     # Suggested buy per ticker (CNY)
     suggested: Dict[str, float] = {}
     if sum_us == 0:
-        for t in df["ticker"]:
-            suggested[t] = total_cny / len(df)
-        top1 = df.iloc[0]["ticker"]
-        top2 = ""
+        for t in tickers:
+            suggested[t] = total_cny / len(tickers)
     else:
-        # top 2 underscore
-        df_sorted = df.sort_values("underscore", ascending=False).reset_index(drop=True)
-        top1 = str(df_sorted.iloc[0]["ticker"])
-        top1s = float(df_sorted.iloc[0]["underscore"])
-        top2s = float(df_sorted.iloc[1]["underscore"]) if len(df_sorted) > 1 else 0.0
-        top2 = str(df_sorted.iloc[1]["ticker"]) if top2s > 0 else ""
         if top2s == 0:
-            for t in df["ticker"]:
+            for t in tickers:
                 suggested[t] = total_cny if t == top1 else 0.0
         else:
             denom = top1s + top2s
-            for t in df["ticker"]:
+            for t in tickers:
                 if t == top1:
                     suggested[t] = total_cny * top1s / denom
                 elif t == top2:
@@ -318,115 +530,91 @@ def allocate_orders(
     spread = cfg.execution.spread_cost_pct
     allow_frac = cfg.execution.allow_fractional_shares
     step = cfg.execution.fractional_step
-    buy_fees = BuyFees(
-        commission_per_share=cfg.fees_buy.commission_per_share,
-        commission_min_usd=cfg.fees_buy.commission_min_usd,
-        platform_per_share=cfg.fees_buy.platform_per_share,
-        platform_min_usd=cfg.fees_buy.platform_min_usd,
-        clearing_per_share=cfg.fees_buy.clearing_per_share,
-        other_fixed_fee_usd=cfg.execution.other_fixed_fee_usd,
-    )
+    buy_fees = buy_fees_for(cfg)
 
     # First pass: base shares per ticker
-    orders: Dict[str, OrderLine] = {}
-    leftover_usd_pool = 0.0
-
-    for t in df["ticker"]:
-        cny = float(suggested.get(t, 0.0))
-        if cny <= 0:
-            orders[t] = OrderLine(ticker=t, side="HOLD", shares=0.0, price=float(prices[t]),
-                                  est_fee_usd=0.0, est_gross_usd=0.0, note="")
-            continue
-        usd_budget = (cny / fx) * (1 - spread)
-        shares, fee = affordable_buy_shares(usd_budget, float(prices[t]), allow_frac, step, buy_fees)
-        gross = shares * float(prices[t])
-        cost = gross + fee
-        leftover = max(0.0, usd_budget - cost)
-        leftover_usd_pool += leftover
-        note = "OK" if shares > 0 else "整股/费用限制导致0股"
-        orders[t] = OrderLine(ticker=t, side="BUY" if shares > 0 else "HOLD", shares=shares, price=float(prices[t]),
-                              est_fee_usd=fee, est_gross_usd=gross, note=note)
+    # 所有标的一起算：股数、手续费、成交额、备注都按标的下标放在平行数组里（SoA），
+    # 二次分配也只改数组，最后才一次性生成 OrderLine
+    px = np.array([float(prices[t]) for t in tickers], dtype=np.float64)
+    cny = np.array([float(suggested.get(t, 0.0)) for t in tickers], dtype=np.float64)
+    buying = cny > 0
+    usd_budget = (cny / fx) * (1 - spread)
+    shares_arr, fee_arr = affordable_buy_shares_array(np.where(buying, usd_budget, 0.0), px, allow_frac, step, buy_fees)
+    gross_arr = shares_arr * px
+    leftover_arr = np.maximum(0.0, usd_budget - (gross_arr + fee_arr))
+    # 逐个累加（与原来的顺序求和一致）
+    leftover_usd_pool = float(sum(leftover_arr[buying].tolist(), 0.0))
+
+    is_buy = buying & (shares_arr > 0)
+    notes = np.where(is_buy, "OK", np.where(buying, "整股/费用限制导致0股", "")).astype(object)
+    index = {t: i for i, t in enumerate(tickers)}
 
     # Second allocation: use leftover pool to top1 then top2 (only if base order is BUY)
     def inc_shares(ticker: str, pool: float) -> Tuple[float, float]:
         if pool <= 0:
             return 0.0, pool
-        ol = orders[ticker]
-        if ol.side != "BUY" or ol.shares <= 0:
+        i = index[ticker]
+        if not is_buy[i]:
             return 0.0, pool
 
-        old_shares = ol.shares
+        price = float(px[i])
+        old_shares = float(shares_arr[i])
         old_fee = buy_fees.fee(old_shares)
-        old_cost = old_shares * ol.price + old_fee
+        old_cost = old_shares * price + old_fee
+
+        def ok(add: float) -> bool:
+            return (old_shares + add) * price + buy_fees.fee(old_shares + add) - old_cost <= pool + 1e-10
 
-        # upper bound add
+        # 解析上界：总成本不超过 old_cost + pool 时最多能持有的股数
+        limit = buy_fees.max_affordable_shares(old_cost + pool + 1e-10, price) - old_shares
         if allow_frac:
-            add_est = _round_down(pool / ol.price, step)
+            add_est = _round_down(pool / price, step)
             add_est = float(max(0.0, round(add_est, 10)))
-            # binary-ish via decrement loop
-            add = add_est
-            for _ in range(200000):
-                new_shares = old_shares + add
-                new_fee = buy_fees.fee(new_shares)
-                new_cost = new_shares * ol.price + new_fee
-                inc = new_cost - old_cost
-                if inc <= pool + 1e-10:
-                    # accept
-                    orders[ticker].shares = float(new_shares)
-                    orders[ticker].est_fee_usd = float(new_fee)
-                    orders[ticker].est_gross_usd = float(new_shares * ol.price)
-                    orders[ticker].note = "OK(含二次分配)"
-                    return add, float(pool - inc)
-                add = float(max(0.0, add - step))
-                if add <= 0:
-                    return 0.0, pool
+            if add_est <= 0:
+                # 估算为 0 股时原逻辑照样“接受”一次（加 0 股），备注仍标为二次分配（同 init 的 leftover）
+                notes[i] = "OK(含二次分配)"
+                return 0.0, pool
+            add = float(_step_down_to(add_est, step, limit, ok))
         else:
-            add_est = int(pool // ol.price)
-            add = add_est
-            while add > 0:
-                new_shares = old_shares + add
-                new_fee = buy_fees.fee(float(new_shares))
-                new_cost = float(new_shares) * ol.price + new_fee
-                inc = new_cost - old_cost
-                if inc <= pool + 1e-10:
-                    orders[ticker].shares = float(new_shares)
-                    orders[ticker].est_fee_usd = float(new_fee)
-                    orders[ticker].est_gross_usd = float(new_shares * ol.price)
-                    orders[ticker].note = "OK(含二次分配)"
-                    return float(add), float(pool - inc)
-                add -= 1
+            add = float(_step_down_to(int(pool // price), 1, limit, ok))
+        if add <= 0:
             return 0.0, pool
 
+        new_shares = old_shares + add
+        new_fee = buy_fees.fee(new_shares)
+        inc = new_shares * price + new_fee - old_cost
+        shares_arr[i] = new_shares
+        fee_arr[i] = new_fee
+        gross_arr[i] = new_shares * price
+        notes[i] = "OK(含二次分配)"
+        return add, float(pool - inc)
+
     # Apply
-    if sum_us == 0:
-        # equal split时，top1/top2无意义，仍然沿用 underscore 排名
-        # 这里用当前 underscore 最大的 1-2 只
-        df_sorted = df.sort_values("underscore", ascending=False).reset_index(drop=True)
-        top1 = str(df_sorted.iloc[0]["ticker"])
-        top2 = str(df_sorted.iloc[1]["ticker"]) if len(df_sorted) > 1 and float(df_sorted.iloc[1]["underscore"]) > 0 else ""
     if top1:
         _, leftover_usd_pool = inc_shares(top1, leftover_usd_pool)
     if top2:
         _, leftover_usd_pool = inc_shares(top2, leftover_usd_pool)
 
-    order_list = []
-    total_fee = 0.0
-    total_leftover_cny = 0.0
-
-    for t in df["ticker"]:
-        ol = orders[t]
-        if ol.side == "BUY" and ol.shares > 0:
-            total_fee += ol.est_fee_usd
+    # BUY 订单的手续费按标的顺序逐个累加
+    total_fee = sum(fee_arr[is_buy].tolist(), 0.0)
 
     # 新零钱池：把剩余的 USD（理论上就是 leftover_usd_pool）换回 CNY
     total_leftover_cny = float(leftover_usd_pool * fx)
 
-    return list(orders.values()), float(total_fee), float(total_leftover_cny)
+    order_list = [
+        OrderLine(ticker=t, side="BUY", shares=sh, price=p, est_fee_usd=fee, est_gross_usd=gross, note=note)
+        if b else
+        OrderLine(ticker=t, side="HOLD", shares=0.0, price=p, est_fee_usd=0.0, est_gross_usd=0.0, note=note)
+        for t, b, sh, p, fee, gross, note in zip(
+            tickers, is_buy.tolist(), shares_arr.tolist(), px.tolist(), fee_arr.tolist(), gross_arr.tolist(), notes.tolist()
+        )
+    ]
+    return order_list, float(total_fee), float(total_leftover_cny)
 
 
 def build_equal_weight_init_orders(
     cfg: Config,
-    holdings: pd.DataFrame,
+    holdings: Dict[str, float],
     prices: Dict[str, float],
     invest_cny: float,
 ) -> Tuple[List[OrderLine], float, float]:
@@ -448,16 +636,11 @@ def build_equal_weight_init_orders(
     avail_usd = invest_usd * (1.0 - spread)
     per_usd = avail_usd / n
 
-    buy_fees = BuyFees(
-        commission_per_share=cfg.fees_buy.commission_per_share,
-        commission_min_usd=cfg.fees_buy.commission_min_usd,
-        platform_per_share=cfg.fees_buy.platform_per_share,
-        platform_min_usd=cfg.fees_buy.platform_min_usd,
-        clearing_per_share=cfg.fees_buy.clearing_per_share,
-        other_fixed_fee_usd=cfg.execution.other_fixed_fee_usd,
-    )
+    buy_fees = buy_fees_for(cfg)
 
     orders: List[OrderLine] = []
+    # 按 ticker 查订单（同一 ticker 重复出现时取第一笔）
+    orders_by_ticker: Dict[str, OrderLine] = {}
     used_total = 0.0
     fee_total = 0.0
 
@@ -466,33 +649,27 @@ def build_equal_weight_init_orders(
     for t in tickers:
         price = float(prices[t])
         if price <= 0:
-            orders.append(OrderLine(ticker=t, side="HOLD", shares=0.0, price=price, est_fee_usd=0.0, est_gross_usd=0.0, note="bad price"))
+            ol = OrderLine(ticker=t, side="HOLD", shares=0.0, price=price, est_fee_usd=0.0, est_gross_usd=0.0, note="bad price")
+            orders.append(ol)
+            orders_by_ticker.setdefault(t, ol)
             per_used[t] = 0.0
             continue
 
-        # initial guess
-        shares = per_usd / price
+        def ok(x: float) -> bool:
+            return x * price + buy_fees.fee(x) <= per_usd + 1e-9
+
+        # initial guess，再按解析上界一步退到预算内（同 inc_shares）
+        limit = buy_fees.max_affordable_shares(per_usd + 1e-9, price)
         if allow_frac:
-            shares = _round_down(shares, step)
+            shares = _step_down_to(_round_down(per_usd / price, step), step, limit, ok)
         else:
-            shares = float(int(shares))
-
-        # adjust down until within budget after fees
-        for _ in range(10000):
-            fee = buy_fees.fee(shares) if shares > 0 else 0.0
-            cost = shares * price + fee
-            if cost <= per_usd + 1e-9:
-                break
-            shares = shares - (step if allow_frac else 1.0)
-            if shares <= 0:
-                shares = 0.0
-                break
+            shares = _step_down_to(float(int(per_usd / price)), 1.0, limit, ok)
 
         fee = buy_fees.fee(shares) if shares > 0 else 0.0
         gross = shares * price
         cost = gross + fee
 
-        orders.append(OrderLine(
+        ol = OrderLine(
             ticker=t,
             side="BUY" if shares > 0 else "HOLD",
             shares=float(shares),
@@ -500,7 +677,9 @@ def build_equal_weight_init_orders(
             est_fee_usd=float(fee),
             est_gross_usd=float(gross),
             note="init equal-weight",
-        ))
+        )
+        orders.append(ol)
+        orders_by_ticker.setdefault(t, ol)
         per_used[t] = float(cost)
         used_total += float(cost)
         fee_total += float(fee)
@@ -509,31 +688,30 @@ def build_equal_weight_init_orders(
     remaining = float(avail_usd - used_total)
     if remaining > 0 and allow_frac:
         # choose ticker with smallest used relative to per_usd
-        t_best = min(tickers, key=lambda x: per_used.get(x, 0.0))
-        ol = next(o for o in orders if o.ticker == t_best)
+        t_best = min(per_used, key=per_used.__getitem__)
+        ol = orders_by_ticker[t_best]
         if ol.side == "BUY" and ol.price > 0:
             old_sh = ol.shares
             old_fee = ol.est_fee_usd
             old_cost = old_sh * ol.price + old_fee
 
-            add_sh = _round_down(remaining / ol.price, step)
-            # shrink until feasible after fee increase
-            for _ in range(10000):
+            def ok_add(add: float) -> bool:
+                return (old_sh + add) * ol.price + buy_fees.fee(old_sh + add) - old_cost <= remaining + 1e-9
+
+            # shrink until feasible after fee increase；一股都加不上时（估算本身为 0 除外）不改订单
+            add_est = _round_down(remaining / ol.price, step)
+            limit = buy_fees.max_affordable_shares(old_cost + remaining + 1e-9, ol.price) - old_sh
+            add_sh = _step_down_to(add_est, step, limit, ok_add) if add_est > 0 else 0.0
+            if add_sh > 0 or add_est <= 0:
                 new_sh = old_sh + add_sh
                 new_fee = buy_fees.fee(new_sh)
-                new_cost = new_sh * ol.price + new_fee
-                inc = new_cost - old_cost
-                if inc <= remaining + 1e-9:
-                    ol.shares = float(new_sh)
-                    ol.est_fee_usd = float(new_fee)
-                    ol.est_gross_usd = float(new_sh * ol.price)
-                    ol.note = "init equal-weight + leftover"
-                    used_total += float(inc)
-                    fee_total += float(new_fee - old_fee)
-                    remaining -= float(inc)
-                    break
-                add_sh = max(0.0, add_sh - step)
-                if add_sh <= 0:
-                    break
+                inc = new_sh * ol.price + new_fee - old_cost
+                ol.shares = float(new_sh)
+                ol.est_fee_usd = float(new_fee)
+                ol.est_gross_usd = float(new_sh * ol.price)
+                ol.note = "init equal-weight + leftover"
+                used_total += float(inc)
+                fee_total += float(new_fee - old_fee)
+                remaining -= float(inc)
 
     return orders, float(used_total), float(fee_total)